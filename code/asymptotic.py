@@ -0,0 +1,264 @@
+"""
+Asymptotic variants of the estimators in :mod:`estimation` for graphs with millions of nodes.
+
+The exact Stirling numbers, Bell numbers and binomial coefficients are replaced by log-space approximations
+that cost :math:`O(1)` per value:
+
+* :math:`S(n, k)` by the saddle point approximation of :math:`n! [z^n] (e^z - 1)^k / k!`. The error of the
+  Gaussian approximation for a small distance :math:`j = n - k` equals the error of Stirling's formula for
+  :math:`j!`, which is corrected as well. The relative error is below 0.1% for :math:`n \\geq 50` and decreases
+  with :math:`1/n`.
+* :math:`B(n)` by the saddle point approximation of :math:`n! [z^n] e^{e^z - 1}`.
+* :math:`\\log n!` by Stirling's series.
+
+The expected number of edges of the partition induced graph (see :func:`estimation.edge_decrease`) has a
+closed form, see :func:`expected_num_edges`. Hence, the whole k-profile is computed in :math:`O(n)` time. All
+results are :math:`\\log_{10}` values; for :math:`n \\leq` ``EXACT_MAX_N``, exact values are used instead.
+"""
+from __future__ import print_function, division, absolute_import, unicode_literals
+import abc
+import math
+
+import numpy as np
+
+from combinatorics import bell, binomial, stirling
+
+# Up to this number of nodes, the exact numbers are used
+EXACT_MAX_N = 100
+
+# Below this argument, log(x!) is looked up instead of using Stirling's series
+_LOG_FACTORIAL_TABLE = np.array([math.lgamma(x + 1) for x in range(20)])
+
+# Maximum number of values that are approximated at once (bounds the size of temporary arrays)
+_CHUNK_SIZE = 2 ** 20
+
+
+def log_factorial(x):
+    """
+    The natural logarithm of :math:`x!` for an integer array *x*
+    """
+    x = np.asarray(x, dtype=float)
+    small = x < len(_LOG_FACTORIAL_TABLE)
+    large_x = np.where(small, len(_LOG_FACTORIAL_TABLE), x)
+    series = (large_x * np.log(large_x) - large_x + 0.5 * np.log(2 * np.pi * large_x) +
+              1 / (12 * large_x) - 1 / (360 * large_x ** 3) + 1 / (1260 * large_x ** 5))
+    return np.where(small, _LOG_FACTORIAL_TABLE[np.where(small, x, 0).astype(int)], series)
+
+
+def _stirling_formula_error(j):
+    """
+    :math:`\\log j! - \\log(\\sqrt{2 \\pi j} j^j e^{-j})` for an integer array :math:`j \\geq 1`
+    """
+    return log_factorial(j) - (0.5 * np.log(2 * np.pi * j) + j * np.log(j) - j)
+
+
+def _log_stirling_approximation(n, k):
+    """
+    Saddle point approximation of :math:`\\log S(n, k)` for an array :math:`1 < k < n`
+    """
+    v = n / k
+    # The saddle point rho solves v = rho / (1 - e^{-rho}); Newton's method from an approximate start
+    rho = np.where(v < 2, 2 * (v - 1), v * (1 - np.exp(-v)))
+    # For k close to n, rho is tiny and rounding limits the attainable precision, hence the bounded iterations
+    for _ in range(100):
+        step = (rho + v * np.expm1(-rho)) / (1 - v * np.exp(-rho))
+        rho -= step
+        if np.all(np.abs(step) <= 1e-12 * rho):
+            break
+
+    one_minus_exp = -np.expm1(-rho)
+    log_exp_minus_one = rho + np.log(one_minus_exp)  # log(e^rho - 1)
+    # 1 - (1 + rho) e^{-rho}, by its series for small rho to avoid cancellation
+    numerator = np.where(rho < 1e-3, rho ** 2 * (0.5 - rho / 3 + rho ** 2 / 8),
+                         one_minus_exp - rho * np.exp(-rho))
+    # Variance of the saddle point: rho e^rho (e^rho - 1 - rho) / (e^rho - 1)^2
+    variance = rho * numerator / one_minus_exp ** 2
+
+    return (log_factorial(n) - log_factorial(k) + k * log_exp_minus_one - n * np.log(rho) -
+            0.5 * np.log(2 * np.pi * k * variance) - _stirling_formula_error(n - k))
+
+
+def log_stirling_row(n):
+    """
+    Approximate :math:`\\log S(n, k)` for all :math:`k = 0, \\dots, n` (:math:`-\\infty` for :math:`k = 0`)
+    """
+    if n <= EXACT_MAX_N:
+        return np.array([math.log(stirling(n, k)) if stirling(n, k) else -np.inf for k in range(n + 1)])
+
+    row = np.empty(n + 1)
+    row[0] = -np.inf
+    row[1] = row[n] = 0
+    for start in range(2, n, _CHUNK_SIZE):
+        k = np.arange(start, min(start + _CHUNK_SIZE, n), dtype=float)
+        row[start:start + len(k)] = _log_stirling_approximation(float(n), k)
+    return row
+
+
+def log_binomial_row(n):
+    """
+    Approximate :math:`\\log \\binom{n}{k}` for all :math:`k = 0, \\dots, n`
+    """
+    if n <= EXACT_MAX_N:
+        return np.array([math.log(binomial(n, k)) for k in range(n + 1)])
+
+    k = np.arange(n + 1, dtype=float)
+    return log_factorial(float(n)) - log_factorial(k) - log_factorial(n - k)
+
+
+def log_bell(n):
+    """
+    Approximate :math:`\\log B(n)`
+    """
+    if n <= EXACT_MAX_N:
+        return math.log(bell(n))
+
+    # The saddle point rho solves rho e^rho = n (Lambert W)
+    rho = math.log(n) - math.log(math.log(n))
+    for _ in range(100):
+        step = (rho - math.log(n) + math.log(rho)) / (1 + 1 / rho)
+        rho -= step
+        if abs(step) < 1e-15 * rho:
+            break
+
+    return (float(log_factorial(float(n))) + math.expm1(rho) - n * math.log(rho) -
+            0.5 * math.log(2 * math.pi * n * (1 + rho)))
+
+
+def expected_num_edges(n, m, k):
+    """
+    Closed form of :func:`estimation.num_edges_per_level`: Unrolling :math:`m_{i} = m_{i+1} (i-2) / i + 1`
+    (:math:`m_i` is the expected number of edges with :math:`i` clusters) yields
+    :math:`m_k = \\frac{(k-1)(k-2)}{(n-1)(n-2)} m + (k-1) - \\frac{(k-1)(k-2)}{n-2}` for :math:`n > 2`.
+    *k* may be an array.
+    """
+    k = np.asarray(k, dtype=float)
+    return (k - 1) * (k - 2) * m / ((n - 1) * (n - 2)) + (k - 1) - (k - 1) * (k - 2) / (n - 2)
+
+
+class AsymptoticEstimator(object, metaclass=abc.ABCMeta):
+    """
+    Abstract base class of the asymptotic estimators. The estimates equal those of the estimator in
+    :mod:`estimation` with the same name (without the prefix 'asymptotic_') up to the approximation error.
+    """
+    @abc.abstractmethod
+    def log_profile(self, n, m):
+        """
+        The natural logarithms of the estimated numbers of :math:`k`-partitions as array of length :math:`n+1`
+        (:math:`-\\infty` for :math:`k = 0`)
+        """
+        pass
+
+    @abc.abstractproperty
+    def name(self):
+        pass
+
+    def log10_profile(self, n, m):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return self.log_profile(n, m) / math.log(10)
+
+    def log10_num_partitions(self, n, m, k=None):
+        """
+        The :math:`\\log_{10}` of the estimated number of partitions into *k* clusters (all partitions if *k* is
+        None)
+        """
+        with np.errstate(divide='ignore', invalid='ignore'):
+            profile = self.log_profile(n, m)
+            if k is None:
+                return float(np.logaddexp.reduce(profile) / math.log(10))
+            return float(profile[k] / math.log(10))
+
+    @staticmethod
+    def _profile_ends(n, m):
+        """
+        A log profile with the exact values for :math:`k \\in \\{1, n-1, n\\}` (see :func:`estimation._profile_ends`)
+        """
+        profile = np.full(n + 1, -np.inf)
+        if n > 2:
+            profile[n - 1] = math.log(m)
+        profile[1] = profile[n] = 0
+        return profile
+
+
+class AsymptoticDensityEstimator(AsymptoticEstimator):
+    @property
+    def name(self):
+        return 'asymptotic_density_estimator'
+
+    def log_profile(self, n, m):
+        profile = self._profile_ends(n, m)
+        if n > 2:
+            k = np.arange(2, n)
+            densities = expected_num_edges(n, m, k) / (k * (k - 1) / 2)
+            profile[2:n] = log_stirling_row(n)[2:n] + np.log(densities)
+        return profile
+
+
+class AsymptoticStirlingRatioEstimator(AsymptoticEstimator):
+    @property
+    def name(self):
+        return 'asymptotic_stirling_ratio_estimator'
+
+    def log_profile(self, n, m):
+        # The ratios telescope: m S(n, k) / S(n, n-1)
+        profile = self._profile_ends(n, m)
+        if n > 3:
+            log_stirling = log_stirling_row(n)
+            profile[2:n - 1] = math.log(m) - log_stirling[n - 1] + log_stirling[2:n - 1]
+        return profile
+
+
+class AsymptoticStirlingDeltaEstimator(AsymptoticEstimator):
+    @property
+    def name(self):
+        return 'asymptotic_stirling_delta_estimator'
+
+    def log_profile(self, n, m):
+        # The deltas telescope: S(n, k) - (S(n, n-1) - m)
+        profile = self._profile_ends(n, m)
+        if n > 3:
+            log_stirling = log_stirling_row(n)[2:n - 1]
+            with np.errstate(divide='ignore'):
+                log_offset = np.log(n * (n - 1) / 2 - m)
+            profile[2:n - 1] = log_stirling + np.log1p(-np.exp(log_offset - log_stirling))
+        return profile
+
+
+class AsymptoticLbUbRatioEstimator(AsymptoticEstimator):
+    @property
+    def name(self):
+        return 'asymptotic_lb_ub_ratio_estimator'
+
+    def log_profile(self, n, m):
+        # The ratio between the bounds changes with k, so the recursion is evaluated step by step
+        profile = self._profile_ends(n, m)
+        if n > 3 and m == n * (n - 1) // 2:  # Complete graph: The ratio is 0, i.e. the estimate is the upper bound
+            profile[2:n - 1] = log_stirling_row(n)[2:n - 1]
+        elif n > 3:
+            log_ub = log_stirling_row(n).tolist()
+            log_lb = np.concatenate(([-np.inf], log_binomial_row(n - 1))).tolist()  # log binom(n-1, k-1)
+            log_est = profile[n - 1]
+            for k in range(n - 2, 1, -1):
+                est_ratio = math.expm1(log_est - log_ub[k + 1]) / math.expm1(log_lb[k + 1] - log_ub[k + 1])
+                factor = (est_ratio * math.exp(log_lb[k] - log_lb[k + 1]) +
+                          (1 - est_ratio) * math.exp(log_ub[k] - log_ub[k + 1]))
+                log_est += math.log(factor) if factor > 0 else -np.inf
+                profile[k] = log_est if factor > 0 else np.nan
+        return profile
+
+
+class AsymptoticLbUbDeltaEstimator(AsymptoticEstimator):
+    @property
+    def name(self):
+        return 'asymptotic_lb_ub_delta_estimator'
+
+    def log_profile(self, n, m):
+        # The ratio between lower and upper bound stays the same for all k: est = r lb + (1 - r) ub
+        profile = self._profile_ends(n, m)
+        if n > 3:
+            ub = n * (n - 1) / 2  # S(n, n-1)
+            est_ratio = (ub - m) / (ub - (n - 1))
+            log_lb = log_binomial_row(n - 1)[1:n - 2]
+            log_ub = log_stirling_row(n)[2:n - 1]
+            with np.errstate(divide='ignore'):
+                profile[2:n - 1] = np.logaddexp(np.log(est_ratio) + log_lb, np.log1p(-est_ratio) + log_ub)
+        return profile
@@ -0,0 +1,221 @@
+"""
+This script benchmarks the search space enumeration and the estimators, so that performance regressions
+become visible.
+
+The search space is built for parameterized graph families (paths, cycles, stars, complete graphs, wheels and
+grids) of growing size and for selected graphs of an input file. The estimator profiles are computed for
+growing numbers of nodes. Each benchmark reports its best time of several repetitions and the peak memory
+allocated by Python during a separate run (measured with :mod:`tracemalloc`). The results are written to a csv
+file that can be passed as ``--baseline`` to a later run to compare against it.
+"""
+from __future__ import print_function, division, absolute_import, unicode_literals
+import argparse
+import gc
+import sys
+import time
+import tracemalloc
+
+from networkx import (complete_graph, convert_node_labels_to_integers, cycle_graph, grid_2d_graph, path_graph,
+                      star_graph, wheel_graph)
+import numpy as np
+import pandas as pd
+
+from asymptotic import (AsymptoticDensityEstimator, AsymptoticLbUbDeltaEstimator, AsymptoticLbUbRatioEstimator,
+                        AsymptoticStirlingDeltaEstimator, AsymptoticStirlingRatioEstimator)
+from datastructures import SearchSpace
+from searchspace import BACKENDS, ESTIMATORS, read_graphs
+
+# Graph families by name: A function of the size parameter returns the graph
+FAMILIES = {'path': path_graph,
+            'cycle': cycle_graph,
+            'star': lambda size: star_graph(size - 1),  # size nodes
+            'complete': complete_graph,
+            'wheel': wheel_graph,
+            'grid': lambda size: convert_node_labels_to_integers(grid_2d_graph(2, size // 2))}  # 2 x size/2 nodes
+
+# The sizes of the family graphs; the complete graphs are limited because their search spaces grow fastest
+FAMILY_SIZES = {'complete': range(3, 10)}
+DEFAULT_SIZES = range(4, 13)
+
+DEFAULT_GRAPHS = ['X_{196}', 'X_{203}']
+
+ASYMPTOTIC_ESTIMATORS = [AsymptoticDensityEstimator(),
+                         AsymptoticStirlingRatioEstimator(),
+                         AsymptoticStirlingDeltaEstimator(),
+                         AsymptoticLbUbRatioEstimator(),
+                         AsymptoticLbUbDeltaEstimator()]
+
+# Benchmarks are identified by these columns
+KEY = ['benchmark', 'case', 'n', 'm']
+
+
+def measure(func, repeat, memory=True, max_seconds=10):
+    """
+    Call *func* *repeat* times (only once if this takes longer than *max_seconds*) and, if *memory* is True,
+    once more while tracing the memory allocations.
+
+    :return: A tuple *(best time in seconds, peak memory in bytes or None)*
+    """
+    seconds = float('inf')
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        seconds = min(seconds, time.perf_counter() - start)
+        if seconds > max_seconds:
+            break
+
+    if not memory:
+        return seconds, None
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return seconds, peak
+
+
+def _print_record(record):
+    memory = ', {} bytes'.format(record['peak_bytes']) if record['peak_bytes'] is not None else ''
+    print('{benchmark} {case} (n={n}, m={m}): {seconds:.4f}s'.format(**record) + memory)
+    sys.stdout.flush()
+
+
+def build_cases(families, max_n, graphs):
+    """
+    Iterate over the graphs to build: *(case name, graph)* pairs
+    """
+    for family in families:
+        for size in FAMILY_SIZES.get(family, DEFAULT_SIZES):
+            graph = FAMILIES[family](size)
+            if graph.number_of_nodes() <= max_n:
+                yield family, graph
+
+    for graph in graphs:
+        yield graph.name, graph
+
+
+def benchmark_build(cases, backend, repeat, memory=True):
+    """
+    Benchmark :meth:`datastructures.SearchSpace.build` for all *cases* (see :func:`build_cases`)
+    """
+    records = []
+    for case, graph in cases:
+        counter = BACKENDS[backend]
+        result = {}
+
+        def build():
+            sp = SearchSpace(graph, counter=counter)
+            sp.build()
+            result['num_partitions'] = sp.num_partitions()
+
+        seconds, peak = measure(build, repeat, memory)
+        records.append({'benchmark': 'build_{}'.format(backend), 'case': case, 'n': graph.number_of_nodes(),
+                        'm': graph.number_of_edges(), 'seconds': seconds, 'peak_bytes': peak,
+                        'num_partitions': result['num_partitions']})
+        _print_record(records[-1])
+
+    return records
+
+
+def benchmark_estimators(sizes, asymptotic_sizes, repeat, memory=True, batch_size=1000):
+    """
+    Benchmark the estimators for graphs with :math:`n` nodes and :math:`m = 2n` edges: the exact profile
+    (:meth:`estimation.PartitionNumberEstimator.num_partitions_profile`), the vectorized batch of *batch_size*
+    graphs with up to :math:`n` nodes (:meth:`estimation.PartitionNumberEstimator.log_profiles`) for all *sizes*
+    and the asymptotic profile (see :mod:`asymptotic`) for all *asymptotic_sizes*.
+    """
+    def record(benchmark, case, n, func):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            seconds, peak = measure(func, repeat, memory)
+        records.append({'benchmark': benchmark, 'case': case, 'n': n, 'm': 2 * n, 'seconds': seconds,
+                        'peak_bytes': peak, 'num_partitions': None})
+        _print_record(records[-1])
+
+    records = []
+    for n in sizes:
+        batch_n = np.linspace(5, n, batch_size).astype(int)  # At least 2n edges possible
+        for estimator in ESTIMATORS:
+            record('estimator_profile', estimator.name, n, lambda: estimator.num_partitions_profile(n, 2 * n))
+            record('estimator_batch', estimator.name, n, lambda: estimator.log_profiles(batch_n, 2 * batch_n))
+
+    for n in asymptotic_sizes:
+        for estimator in ASYMPTOTIC_ESTIMATORS:
+            record('estimator_asymptotic', estimator.name, n, lambda: estimator.log_profile(n, 2 * n))
+
+    return records
+
+
+def compare(results, baseline, tolerance):
+    """
+    Join the *results* with the *baseline* (both data frames) and mark the benchmarks that are slower or need
+    more memory than the baseline by more than the relative *tolerance*. Slowdowns below one millisecond are
+    considered as noise.
+    """
+    df = results.merge(baseline[KEY + ['seconds', 'peak_bytes']], on=KEY, how='left', suffixes=('', '_baseline'))
+    df['time_ratio'] = df['seconds'] / df['seconds_baseline']
+    df['memory_ratio'] = df['peak_bytes'] / df['peak_bytes_baseline']
+    slower = (df['time_ratio'] > 1 + tolerance) & (df['seconds'] - df['seconds_baseline'] > 1e-3)
+    df['regression'] = slower | (df['memory_ratio'] > 1 + tolerance)
+    return df
+
+
+def main():
+    argparser = argparse.ArgumentParser(description='Benchmark the search space enumeration and the estimators.')
+    argparser.add_argument('--out', type=str, default=None, help='Path to a csv file for the results')
+    argparser.add_argument('--baseline', type=str, default=None,
+                           help='Path to the csv file of an earlier run to compare the results with')
+    argparser.add_argument('--tolerance', type=float, default=0.25,
+                           help='Relative slowdown (or increase of memory) compared to the baseline that is '
+                                'reported as regression')
+    argparser.add_argument('--backend', type=str, choices=sorted(BACKENDS), default='enumeration',
+                           help='How to build the search spaces (see searchspace.py)')
+    argparser.add_argument('--families', type=str, nargs='*', choices=sorted(FAMILIES), default=sorted(FAMILIES),
+                           help='The graph families to build')
+    argparser.add_argument('--max_n', type=int, default=10, help='Maximum number of nodes of the family graphs')
+    argparser.add_argument('--graphs', type=str, default='../data/input_smallgraphs.csv',
+                           help='Path to a csv file of graphs in Graph6 format (rows: name,graph6)')
+    argparser.add_argument('--names', type=str, nargs='*', default=DEFAULT_GRAPHS,
+                           help='Names of the graphs of --graphs to build (enumerating X_{196} takes minutes)')
+    argparser.add_argument('--estimator_sizes', type=int, nargs='*', default=[10, 30, 100],
+                           help='Numbers of nodes for the estimator benchmarks')
+    argparser.add_argument('--asymptotic_sizes', type=int, nargs='*', default=[10 ** 3, 10 ** 4, 10 ** 5],
+                           help='Numbers of nodes for the asymptotic estimator benchmarks')
+    argparser.add_argument('--repeat', type=int, default=3,
+                           help='Number of timed repetitions of each benchmark (benchmarks that take longer than '
+                                '10 seconds are run once)')
+    argparser.add_argument('--no_memory', nargs='?', const=True, default=False,
+                           help='Do not measure the peak memory (tracing the allocations slows the run down)')
+    args = argparser.parse_args()
+
+    graphs = []
+    if args.names:
+        graphs = {graph.name: graph for graph in read_graphs(args.graphs)}
+        missing = [name for name in args.names if name not in graphs]
+        if missing:
+            argparser.error('Unknown graphs: {}'.format(', '.join(missing)))
+        graphs = [graphs[name] for name in args.names]
+
+    records = benchmark_build(build_cases(args.families, args.max_n, graphs), args.backend, args.repeat,
+                              not args.no_memory)
+    records += benchmark_estimators(args.estimator_sizes, args.asymptotic_sizes, args.repeat, not args.no_memory)
+    results = pd.DataFrame.from_records(records, columns=KEY + ['seconds', 'peak_bytes', 'num_partitions'])
+
+    if args.baseline:
+        results = compare(results, pd.read_csv(args.baseline), args.tolerance)
+        regressions = results[results['regression']]
+        for row in regressions.itertuples():
+            print('Regression of {} {} (n={}, m={}): time x{:.2f}, memory x{:.2f}'.format(
+                row.benchmark, row.case, row.n, row.m, row.time_ratio, row.memory_ratio))
+        print('{} of {} benchmarks regressed'.format(len(regressions), len(results)))
+
+    if args.out:
+        results.to_csv(args.out, index=False)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,271 @@
+"""
+A compact graph representation for SMALL graphs that is based on bit masks.
+
+The nodes of a graph are relabelled to the indices 0, ..., n-1 and the neighbourhood of each node is
+stored as a single integer whose bits mark the adjacent nodes. Sets of nodes (e.g. the clusters of a partition)
+are bit masks as well, which makes merging, neighbourhood and connectivity computations cheap.
+"""
+from __future__ import print_function, division, absolute_import, unicode_literals
+
+from networkx import Graph
+
+
+def popcount(mask):
+    """
+    Number of set bits in *mask*
+    """
+    return bin(mask).count('1')
+
+
+def lowest_bit(mask):
+    """
+    The lowest set bit of *mask* (as mask, not as index)
+    """
+    return mask & -mask
+
+
+def iter_bits(mask):
+    """
+    Iterate over the indices of all set bits in *mask* in ascending order
+    """
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+def _bits_to_int(groups):
+    """
+    The integer of consecutive groups of 6 bits (big endian)
+    """
+    value = 0
+    for x in groups:
+        value = (value << 6) | x
+    return value
+
+
+class BitGraph(object):
+    """
+    An undirected simple graph on the nodes 0, ..., n-1 with bit mask adjacency.
+    The original node labels are kept to translate masks back to nodes.
+    """
+    __slots__ = ('_nodes', '_adjacency', 'name')
+
+    def __init__(self, nodes, adjacency, name=''):
+        """
+        :param nodes: The original node labels; the i-th label belongs to index i
+        :param adjacency: A sequence of bit masks; the i-th mask contains the neighbours of node i
+        :param name: The name of the graph
+        """
+        if len(nodes) != len(adjacency):
+            raise ValueError('Each node needs an adjacency mask')
+
+        self._nodes = tuple(nodes)
+        self._adjacency = tuple(adjacency)
+        self.name = name
+
+    @classmethod
+    def from_graph(cls, graph):
+        """
+        Create a bit graph from a NetworkX graph. Self-loops are ignored.
+        If *graph* already is a bit graph, it is returned unchanged.
+        """
+        if isinstance(graph, BitGraph):
+            return graph
+
+        nodes = list(graph.nodes)
+        index = {node: idx for idx, node in enumerate(nodes)}
+        adjacency = [0] * len(nodes)
+        for s, t in graph.edges:
+            if s == t:
+                continue
+            adjacency[index[s]] |= 1 << index[t]
+            adjacency[index[t]] |= 1 << index[s]
+
+        return cls(nodes, adjacency, name=graph.name)
+
+    @classmethod
+    def from_graph6(cls, graph6, name=''):
+        """
+        Decode a graph6 string (without header) into a bit graph on the nodes 0, ..., n-1, without creating a
+        NetworkX graph first.
+        """
+        data = [ord(c) - 63 for c in graph6.strip()]
+        if not data or any(not 0 <= x < 64 for x in data):
+            raise ValueError('Invalid graph6 string: {!r}'.format(graph6))
+
+        # N(n): one byte for n < 63, otherwise 126 followed by 3 (or 126 and 6) bytes of 6 bits each
+        if data[0] < 63:
+            n, data = data[0], data[1:]
+        elif len(data) > 1 and data[1] < 63:
+            n, data = _bits_to_int(data[1:4]), data[4:]
+        else:
+            n, data = _bits_to_int(data[2:8]), data[8:]
+
+        # R(x): the upper triangle of the adjacency matrix column by column, i.e. x(0,1), x(0,2), x(1,2), ...
+        bits = ''.join(format(x, '06b') for x in data)
+        if len(bits) < n * (n - 1) // 2:
+            raise ValueError('Invalid graph6 string: {!r}'.format(graph6))
+
+        adjacency = [0] * n
+        start = 0
+        for j in range(1, n):
+            column = bits[start:start + j]
+            start += j
+            if '1' in column:
+                neighbours = int(column[::-1], 2)  # Bit i marks the edge {i, j}
+                adjacency[j] = neighbours
+                for i in iter_bits(neighbours):
+                    adjacency[i] |= 1 << j
+
+        return cls(range(n), adjacency, name=name)
+
+    def to_graph6(self):
+        """
+        Encode the bit graph as graph6 string (without header); the inverse of :meth:`from_graph6`
+        """
+        n = len(self._nodes)
+        if n < 63:
+            groups = [n]
+        elif n < 2 ** 18:
+            groups = [63] + [(n >> shift) & 63 for shift in (12, 6, 0)]
+        else:
+            groups = [63, 63] + [(n >> shift) & 63 for shift in (30, 24, 18, 12, 6, 0)]
+
+        bits = ''.join(format(self._adjacency[j] & ((1 << j) - 1), '0{}b'.format(j))[::-1] if j else ''
+                       for j in range(n))
+        bits += '0' * (-len(bits) % 6)
+        groups.extend(int(bits[idx:idx + 6], 2) for idx in range(0, len(bits), 6))
+        return ''.join(chr(x + 63) for x in groups)
+
+    def to_graph(self):
+        """
+        Convert the bit graph into a NetworkX graph with the original node labels
+        """
+        graph = Graph(name=self.name)
+        graph.add_nodes_from(self._nodes)
+        graph.add_edges_from(self.edges)
+        return graph
+
+    @property
+    def nodes(self):
+        return self._nodes
+
+    @property
+    def adjacency(self):
+        return self._adjacency
+
+    @property
+    def all_nodes(self):
+        """
+        The mask of all nodes
+        """
+        return (1 << len(self._nodes)) - 1
+
+    @property
+    def edges(self):
+        """
+        All edges as pairs of original node labels
+        """
+        return [(self._nodes[i], self._nodes[j]) for i, j in self.index_edges()]
+
+    def index_edges(self):
+        """
+        Iterate over all edges as pairs :math:`(i, j)` of node indices with :math:`i < j`
+        """
+        for i, neighbours in enumerate(self._adjacency):
+            for j in iter_bits(neighbours >> (i + 1)):
+                yield i, i + 1 + j
+
+    def order(self):
+        return len(self._nodes)
+
+    def size(self):
+        return sum(popcount(neighbours) for neighbours in self._adjacency) // 2
+
+    number_of_nodes = order
+    number_of_edges = size
+
+    def degree(self):
+        """
+        The degrees as list of *(node, degree)* pairs, similar to NetworkX
+        """
+        return [(node, popcount(neighbours)) for node, neighbours in zip(self._nodes, self._adjacency)]
+
+    def labels(self, mask):
+        """
+        The original node labels of all nodes in *mask*
+        """
+        return [self._nodes[idx] for idx in iter_bits(mask)]
+
+    def neighbourhood(self, mask):
+        """
+        The union of the neighbourhoods of all nodes in *mask* (may intersect *mask*)
+        """
+        neighbours = 0
+        adjacency = self._adjacency
+        while mask:
+            low = mask & -mask
+            neighbours |= adjacency[low.bit_length() - 1]
+            mask ^= low
+        return neighbours
+
+    def reachable(self, start, mask=None):
+        """
+        All nodes within *mask* that can be reached from the nodes in *start* (which must be part of *mask*).
+        """
+        if mask is None:
+            mask = self.all_nodes
+
+        reached = start
+        frontier = start
+        while frontier:
+            frontier = self.neighbourhood(frontier) & mask & ~reached
+            reached |= frontier
+        return reached
+
+    def is_connected(self, mask=None):
+        """
+        Check whether the subgraph induced by the nodes in *mask* (default: all nodes) is connected.
+        The empty graph is not connected.
+        """
+        if mask is None:
+            mask = self.all_nodes
+        if not mask:
+            return False
+        return self.reachable(mask & -mask, mask) == mask
+
+    def components(self, mask=None):
+        """
+        The node masks of the connected components of the subgraph induced by *mask* (default: all nodes),
+        ordered by their lowest node.
+        """
+        if mask is None:
+            mask = self.all_nodes
+
+        components = []
+        while mask:
+            component = self.reachable(mask & -mask, mask)
+            components.append(component)
+            mask &= ~component
+        return components
+
+    def subgraph(self, mask):
+        """
+        The bit graph induced by the nodes in *mask*, relabelled to 0, ..., |mask|-1
+        """
+        indices = list(iter_bits(mask))
+        position = {idx: pos for pos, idx in enumerate(indices)}
+        adjacency = []
+        for idx in indices:
+            adjacency.append(sum(1 << position[j] for j in iter_bits(self._adjacency[idx] & mask)))
+        return BitGraph([self._nodes[idx] for idx in indices], adjacency, name=self.name)
+
+    def __len__(self):
+        return len(self._nodes)
+
+    def __getstate__(self):
+        return self._nodes, self._adjacency, self.name
+
+    def __setstate__(self, state):
+        self._nodes, self._adjacency, self.name = state
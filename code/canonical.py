@@ -0,0 +1,105 @@
+"""
+Canonical labelling of SMALL graphs with bit mask adjacency.
+
+A structure consists of :math:`n` nodes, one or more symmetric relations between them (e.g. the edges of a
+graph and a second set of 'marked' node pairs) and optional node colours. Two structures are isomorphic iff
+their certificates are equal. The search follows the individualization-refinement scheme: The nodes are
+coloured by an equitable ordered partition, and ties are broken by individualizing each node of the first
+smallest non-singleton cell. The certificate is the smallest adjacency encoding among all leaves of the
+search tree. Nodes that are twins (equal neighbourhoods in each relation) are interchangeable, so only one
+of them is individualized.
+"""
+from __future__ import print_function, division, absolute_import, unicode_literals
+
+from bitgraph import iter_bits, popcount
+
+
+def _refine(cells, relations):
+    """
+    Refine the ordered partition *cells* (list of node masks) until it is equitable w.r.t. all *relations*:
+    The nodes of each cell have the same number of neighbours in every cell.
+    """
+    while True:
+        refined = []
+        for cell in cells:
+            if not cell & (cell - 1):  # Singleton
+                refined.append(cell)
+                continue
+
+            groups = {}
+            for node in iter_bits(cell):
+                signature = tuple(popcount(adjacency[node] & other) for adjacency in relations for other in cells)
+                groups[signature] = groups.get(signature, 0) | (1 << node)
+
+            refined.extend(groups[signature] for signature in sorted(groups))
+
+        if len(refined) == len(cells):
+            return refined
+        cells = refined
+
+
+def _are_twins(relations, u, v):
+    mask = ~((1 << u) | (1 << v))
+    return all(adjacency[u] & mask == adjacency[v] & mask for adjacency in relations)
+
+
+def _certificate(ordering, relations):
+    position = {node: pos for pos, node in enumerate(ordering)}
+    return tuple(tuple(sum(1 << position[j] for j in iter_bits(adjacency[node])) for node in ordering)
+                 for adjacency in relations)
+
+
+def _initial_cells(n, colours):
+    if colours is None:
+        return [(1 << n) - 1] if n else []
+
+    classes = {}
+    for node, colour in enumerate(colours):
+        classes[colour] = classes.get(colour, 0) | (1 << node)
+    return [classes[colour] for colour in sorted(classes)]
+
+
+def canonical_labelling(n, relations, colours=None):
+    """
+    Compute a canonical labelling of a structure on the nodes :math:`0, \\dots, n-1`.
+
+    :param n: The number of nodes
+    :param relations: A list of symmetric relations, each a sequence of :math:`n` neighbour masks
+    :param colours: Optional sequence of :math:`n` sortable node colours; isomorphisms preserve colours
+    :return: A tuple *(certificate, ordering)*; *ordering* lists the nodes in canonical order
+    """
+    relations = [tuple(adjacency) for adjacency in relations]
+    colour_key = tuple(sorted(colours)) if colours is not None else None
+    best = [None, None]
+
+    def search(cells):
+        cells = _refine(cells, relations)
+        if len(cells) == n:  # Discrete partition -> leaf
+            ordering = [cell.bit_length() - 1 for cell in cells]
+            certificate = _certificate(ordering, relations)
+            if best[0] is None or certificate < best[0]:
+                best[0] = certificate
+                best[1] = ordering
+            return
+
+        target_idx = min((idx for idx, cell in enumerate(cells) if cell & (cell - 1)),
+                         key=lambda idx: popcount(cells[idx]))
+        target = cells[target_idx]
+        tried = []
+        for node in iter_bits(target):
+            if any(_are_twins(relations, node, other) for other in tried):
+                continue
+            tried.append(node)
+            bit = 1 << node
+            search(cells[:target_idx] + [bit, target & ~bit] + cells[target_idx + 1:])
+
+    search(_initial_cells(n, colours))
+
+    return (n, colour_key, best[0]), best[1]
+
+
+def canonical_form(n, relations, colours=None):
+    """
+    The certificate of :func:`canonical_labelling`
+    """
+    return canonical_labelling(n, relations, colours)[0]
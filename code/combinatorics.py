@@ -0,0 +1,122 @@
+"""
+Exact tables of Stirling numbers of the second kind, Bell numbers and binomial coefficients.
+
+The tables are built with plain integer recurrences and grow lazily: The first request for a value of
+:math:`n` computes all missing rows up to :math:`n`, later requests are simple lookups. The tables are shared
+by all callers of this module and can be saved to and loaded from a file to persist them across runs.
+"""
+from __future__ import print_function, division, absolute_import, unicode_literals
+import os
+import pickle
+
+
+class CombinatoricsTables(object):
+    """
+    Rows :math:`0, \\dots, n` of the triangles of Stirling numbers of the second kind and of binomial coefficients
+    """
+
+    def __init__(self):
+        self._stirling = [[1]]  # S(0, 0) = 1
+        self._binomial = [[1]]
+
+    @property
+    def max_n(self):
+        return len(self._stirling) - 1
+
+    def grow(self, n):
+        """
+        Extend the tables up to row *n*
+        """
+        if n < 0:
+            raise ValueError('n must not be negative')
+
+        stirling_rows = self._stirling
+        binomial_rows = self._binomial
+        while len(stirling_rows) <= n:
+            # S(n, k) = k S(n-1, k) + S(n-1, k-1)
+            previous = stirling_rows[-1]
+            row = [0] * (len(previous) + 1)
+            for k in range(1, len(row)):
+                row[k] = previous[k - 1] + (k * previous[k] if k < len(previous) else 0)
+            stirling_rows.append(row)
+
+            # binom(n, k) = binom(n-1, k) + binom(n-1, k-1)
+            previous = binomial_rows[-1]
+            binomial_rows.append([1] + [previous[k - 1] + previous[k] for k in range(1, len(previous))] + [1])
+
+    def stirling(self, n, k):
+        """
+        The Stirling number of the second kind :math:`S(n, k)`
+        """
+        if not 0 <= k <= n:
+            return 0
+        self.grow(n)
+        return self._stirling[n][k]
+
+    def stirling_row(self, n):
+        """
+        All numbers :math:`S(n, k)` for :math:`k = 0, \\dots, n` (do not modify the list)
+        """
+        self.grow(n)
+        return self._stirling[n]
+
+    def bell(self, n):
+        """
+        The Bell number :math:`B(n) = \\sum_k S(n, k)`
+        """
+        return sum(self.stirling_row(n))
+
+    def binomial(self, n, k):
+        """
+        The binomial coefficient :math:`\\binom{n}{k}`
+        """
+        if not 0 <= k <= n:
+            return 0
+        self.grow(n)
+        return self._binomial[n][k]
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            pickle.dump((self._stirling, self._binomial), f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def load(self, path):
+        """
+        Load tables that were saved with :meth:`save` if they are larger than the current ones
+        """
+        if not os.path.exists(path):
+            return
+
+        with open(path, 'rb') as f:
+            stirling_rows, binomial_rows = pickle.load(f)
+        if len(stirling_rows) > len(self._stirling):
+            self._stirling = stirling_rows
+            self._binomial = binomial_rows
+
+
+_TABLES = CombinatoricsTables()
+
+
+def stirling(n, k):
+    return _TABLES.stirling(n, k)
+
+
+def bell(n):
+    return _TABLES.bell(n)
+
+
+def binomial(n, k):
+    return _TABLES.binomial(n, k)
+
+
+def load_tables(path):
+    """
+    Load the shared tables from *path* (if it exists)
+    """
+    _TABLES.load(path)
+
+
+def save_tables(path):
+    """
+    Save the shared tables to *path*
+    """
+    _TABLES.save(path)
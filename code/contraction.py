@@ -0,0 +1,230 @@
+"""
+Count the connected partitions of a graph by a memoized deletion-contraction recurrence.
+
+For an edge :math:`e = \\{u, v\\}` every connected partition either puts :math:`u` and :math:`v` into the same
+cluster, which corresponds to a connected partition of the contracted graph :math:`G / e` (as in
+:meth:`datastructures.SearchSpaceNode.expand`), or it separates them, which corresponds to a connected partition
+of :math:`G - e` in which :math:`u` and :math:`v` must stay separated. The subproblems therefore carry a second
+relation of *separated* node pairs. Parallel edges created by a contraction are merged, as they do not change
+connectivity, and an edge between separated nodes can be dropped. Subproblems are memoized by their canonical
+form (see :mod:`canonical`), so isomorphic subproblems are solved only once. The memo table is bounded, the least
+recently used subproblems are dropped first.
+"""
+from __future__ import print_function, division, absolute_import, unicode_literals
+from collections import OrderedDict
+import os
+import pickle
+
+from bitgraph import BitGraph, iter_bits, popcount
+from canonical import canonical_form
+from combinatorics import stirling
+from counting import biconnected_blocks, decomposed_profile, multiply_profiles
+
+# Default maximum number of memoized subproblems (one entry of a graph with about 14 nodes takes a few KiB)
+MEMO_MAX_ENTRIES = 20000
+
+
+def _remove_node(masks, node):
+    """
+    Remove *node* from all neighbour *masks* and shift the higher node indices down by one
+    """
+    low = (1 << node) - 1
+    return [(mask & low) | ((mask >> 1) & ~low) for idx, mask in enumerate(masks) if idx != node]
+
+
+def _restrict(masks, component):
+    """
+    Restrict the neighbour *masks* to the nodes in *component* and relabel them to 0, 1, ...
+    """
+    indices = list(iter_bits(component))
+    position = {idx: pos for pos, idx in enumerate(indices)}
+    return [sum(1 << position[j] for j in iter_bits(masks[idx] & component)) for idx in indices]
+
+
+def _components(adjacency):
+    n = len(adjacency)
+    remaining = (1 << n) - 1
+    components = []
+    while remaining:
+        component = frontier = remaining & -remaining
+        while frontier:
+            neighbours = 0
+            for idx in iter_bits(frontier):
+                neighbours |= adjacency[idx]
+            frontier = neighbours & remaining & ~component
+            component |= frontier
+        components.append(component)
+        remaining &= ~component
+    return components
+
+
+class ContractionCounter(object):
+    """
+    A counter (see :class:`datastructures.SearchSpace`) that returns the k-profile of a graph.
+    The memo table is shared by all graphs that are counted with the same instance and keeps at most *max_entries*
+    subproblems (least recently used first out). If a *memo_path* is given, a previously saved memo table is loaded
+    from this file and :meth:`save` writes it back.
+    """
+
+    def __init__(self, memo_path=None, max_entries=MEMO_MAX_ENTRIES):
+        self._memo_path = memo_path
+        self._max_entries = max_entries
+        self._memo = OrderedDict()
+
+        if memo_path is not None and os.path.exists(memo_path):
+            with open(memo_path, 'rb') as f:
+                self._memo = OrderedDict(pickle.load(f))
+            self._shrink()
+
+    @property
+    def memo(self):
+        return self._memo
+
+    def save(self):
+        """
+        Write the memo table to the memo path (if given)
+        """
+        if self._memo_path is None:
+            return
+
+        tmp_path = self._memo_path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(self._memo, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self._memo_path)
+
+    def _lookup(self, key):
+        profile = self._memo.get(key)
+        if profile is not None:
+            self._memo.move_to_end(key)
+            return list(profile)
+        return None
+
+    def _store(self, key, profile):
+        self._memo[key] = tuple(profile)
+        self._shrink()
+
+    def _shrink(self):
+        while len(self._memo) > self._max_entries:
+            self._memo.popitem(last=False)
+
+    def __call__(self, graph):
+        bitgraph = BitGraph.from_graph(graph)
+        return self.count(list(bitgraph.adjacency), [0] * bitgraph.order())
+
+    def count(self, adjacency, separated):
+        """
+        Get the k-profile of the graph with neighbour masks *adjacency*, where the node pairs in *separated*
+        (neighbour masks as well) must not be part of the same cluster.
+        """
+        n = len(adjacency)
+        # An edge between separated nodes is never part of a cluster
+        adjacency = [mask & ~separated[idx] for idx, mask in enumerate(adjacency)]
+
+        profile = [1]
+        for component in _components(adjacency):
+            component_adjacency = _restrict(adjacency, component)
+            component_separated = _restrict(separated, component)  # Separation across components is implied
+            profile = multiply_profiles(profile, self._count_connected(component_adjacency, component_separated))
+
+        assert len(profile) == n + 1
+        return profile
+
+    def _count_connected(self, adjacency, separated):
+        n = len(adjacency)
+        num_edges = sum(popcount(mask) for mask in adjacency) // 2
+
+        # Without separated pairs: closed forms for a single node, trees and complete graphs; otherwise the
+        # blocks of the graph can be counted independently
+        if not any(separated):
+            if num_edges == n - 1:
+                profile = [0, 1]
+                for _ in range(n - 1):
+                    profile = multiply_profiles(profile, [1, 1])
+                return profile
+            elif num_edges == n * (n - 1) // 2:
+                return [stirling(n, k) for k in range(n + 1)]
+
+            bitgraph = BitGraph(range(n), adjacency)
+            if len(biconnected_blocks(bitgraph)) > 1:
+                return decomposed_profile(bitgraph, lambda block: self._count_connected(list(block.adjacency),
+                                                                                        [0] * block.order()))
+
+        full = (1 << n) - 1
+        if all(adjacency[idx] | separated[idx] | (1 << idx) == full for idx in range(n)):
+            # Each pair of nodes is either adjacent or separated: every cluster is a clique
+            return self._count_independent(separated)
+
+        key = canonical_form(n, [adjacency, separated])
+        profile = self._lookup(key)
+        if profile is not None:
+            return profile
+
+        # Branch on an edge of a node with the most undecided pairs (neither adjacent nor separated) and the
+        # neighbour that, when contracted, decides most of them
+        undecided = [full & ~(adjacency[idx] | separated[idx] | (1 << idx)) for idx in range(n)]
+        u = max(range(n), key=lambda idx: (popcount(undecided[idx]), popcount(adjacency[idx])))
+        v = max(iter_bits(adjacency[u]), key=lambda idx: (popcount(adjacency[idx] & undecided[u]),
+                                                          popcount(adjacency[idx])))
+        bit_u = 1 << u
+        bit_v = 1 << v
+
+        # Delete: u and v must be separated
+        deleted_adjacency = list(adjacency)
+        deleted_adjacency[u] &= ~bit_v
+        deleted_adjacency[v] &= ~bit_u
+        deleted_separated = list(separated)
+        deleted_separated[u] |= bit_v
+        deleted_separated[v] |= bit_u
+        profile = self.count(deleted_adjacency, deleted_separated)
+
+        # Contract: v is merged into u
+        contracted_adjacency = list(adjacency)
+        contracted_separated = list(separated)
+        for idx in iter_bits(adjacency[v]):
+            contracted_adjacency[idx] |= bit_u
+        for idx in iter_bits(separated[v]):
+            contracted_separated[idx] |= bit_u
+        contracted_adjacency[u] = (adjacency[u] | adjacency[v]) & ~bit_u & ~bit_v
+        contracted_separated[u] = separated[u] | separated[v]
+        contracted = self.count(_remove_node(contracted_adjacency, v), _remove_node(contracted_separated, v))
+
+        for k, num in enumerate(contracted):
+            profile[k] += num
+
+        self._store(key, profile)
+        return profile
+
+    def _count_independent(self, separated):
+        """
+        Get the k-profile of the partitions into clusters that contain no separated pair (i.e. into independent
+        sets of the graph *separated*). For a separated pair :math:`\\{x, y\\}`, the partitions without this
+        constraint are those that separate :math:`x` and :math:`y` plus those that merge them.
+        """
+        n = len(separated)
+        if not any(separated):
+            return [stirling(n, k) for k in range(n + 1)]
+
+        key = ('independent', canonical_form(n, [separated]))
+        profile = self._lookup(key)
+        if profile is not None:
+            return profile
+
+        x = max(range(n), key=lambda idx: popcount(separated[idx]))
+        y = max(iter_bits(separated[x]), key=lambda idx: popcount(separated[idx]))
+        bit_x = 1 << x
+        bit_y = 1 << y
+
+        relaxed = list(separated)
+        relaxed[x] &= ~bit_y
+        relaxed[y] &= ~bit_x
+        profile = self._count_independent(relaxed)
+
+        merged = list(relaxed)
+        for idx in iter_bits(relaxed[y]):
+            merged[idx] |= bit_x
+        merged[x] = (relaxed[x] | relaxed[y]) & ~bit_x & ~bit_y
+        for k, num in enumerate(self._count_independent(_remove_node(merged, y))):
+            profile[k] -= num
+
+        self._store(key, profile)
+        return profile
@@ -0,0 +1,177 @@
+"""
+Exact counting of the connected partitions of a graph without enumerating them.
+
+All counting functions return the *k-profile* of a graph: a list *counts* of length :math:`n+1` where
+``counts[k]`` is the number of partitions into :math:`k` connected clusters. The k-profile can be read as
+the coefficients of a polynomial in :math:`k` (``counts[0]`` is the constant coefficient).
+"""
+from __future__ import print_function, division, absolute_import, unicode_literals
+
+from networkx import Graph, biconnected_components
+from networkx.utils import reverse_cuthill_mckee_ordering
+
+from bitgraph import BitGraph, iter_bits, popcount
+
+
+def connected_subsets(bitgraph, start, mask, max_size=None):
+    """
+    Iterate over all node masks :math:`T` with :math:`start \\subseteq T \\subseteq mask` that induce a
+    connected subgraph. *start* must be a connected subset of *mask*. Each subset is generated exactly once.
+    If *max_size* is given, only subsets with at most this many nodes are generated.
+    """
+    adjacency = bitgraph.adjacency
+    # Each stack entry: (current subset, candidates to extend it with, excluded nodes)
+    stack = [(start, bitgraph.neighbourhood(start) & mask & ~start, 0)]
+
+    while stack:
+        subset, candidates, excluded = stack.pop()
+        yield subset
+        if max_size is not None and popcount(subset) >= max_size:
+            continue
+
+        while candidates:
+            low = candidates & -candidates
+            candidates ^= low
+            new_candidates = (candidates | adjacency[low.bit_length() - 1]) & mask & ~subset & ~low & ~excluded
+            stack.append((subset | low, new_candidates, excluded))
+            excluded |= low
+
+
+def subset_dp_profile(graph):
+    """
+    Compute the k-profile of *graph* by dynamic programming over node subsets.
+
+    Every partition of a node set :math:`S` has exactly one cluster that contains the lowest node of
+    :math:`S`. Hence the polynomial :math:`f(S)` of the partitions of :math:`S` is the sum of
+    :math:`k \\cdot f(S \\setminus T)` over all connected subsets :math:`T` of :math:`S` that contain the
+    lowest node. Only the subsets :math:`S` that remain after removing such clusters are evaluated.
+
+    The memo is keyed by the node masks of the remaining nodes, so its size depends on the node order. The nodes
+    are relabelled in reverse Cuthill-McKee order (see :func:`bandwidth_ordered`) first: With a small bandwidth,
+    the remaining nodes are mostly all nodes above some index plus a few nodes near it, which keeps the number of
+    distinct masks small.
+
+    :param graph: A NetworkX graph or a :class:`BitGraph`
+    :return: The k-profile
+    """
+    bitgraph = bandwidth_ordered(BitGraph.from_graph(graph))
+    return subset_profiles(bitgraph)(bitgraph.all_nodes)
+
+
+def bandwidth_ordered(bitgraph):
+    """
+    The bit graph relabelled in reverse Cuthill-McKee order, a breadth-first order that reduces the bandwidth of
+    the adjacency matrix. The original node labels are kept.
+    """
+    graph = Graph()
+    graph.add_nodes_from(range(bitgraph.order()))
+    graph.add_edges_from(bitgraph.index_edges())
+    order = list(reverse_cuthill_mckee_ordering(graph))
+    position = {idx: pos for pos, idx in enumerate(order)}
+    adjacency = [sum(1 << position[j] for j in iter_bits(bitgraph.adjacency[idx])) for idx in order]
+    return BitGraph([bitgraph.nodes[idx] for idx in order], adjacency, name=bitgraph.name)
+
+
+def subset_profiles(bitgraph, memo=None, max_subsets=None):
+    """
+    The memoized recurrence of :func:`subset_dp_profile`: A function that returns the k-profile of the subgraph
+    of *bitgraph* induced by a node mask. The profiles of all evaluated masks are kept in the dict *memo* (e.g. a
+    table of :func:`subset_profile_table`, a new dict by default), so it serves as counting table for repeated
+    queries.
+
+    If *max_subsets* is given, the function returns None instead of a profile as soon as more than this many
+    clusters were enumerated in total. *memo* only contains complete profiles then.
+    """
+    if memo is None:
+        memo = {}
+    memo[0] = [1]
+    budget = [max_subsets]  # Remaining number of clusters
+
+    def count(remaining):
+        if remaining in memo:
+            return memo[remaining]
+
+        result = [0] * (popcount(remaining) + 1)
+        for cluster in connected_subsets(bitgraph, remaining & -remaining, remaining):
+            if budget[0] is not None:
+                budget[0] -= 1
+                if budget[0] < 0:
+                    return None
+
+            profile = count(remaining & ~cluster)
+            if profile is None:
+                return None
+            for k, num in enumerate(profile):
+                if num:
+                    result[k + 1] += num  # One more cluster
+
+        memo[remaining] = result
+        return result
+
+    return count
+
+
+def subset_profile_table(bitgraph, max_subsets=None):
+    """
+    The counting table of :func:`subset_profiles` after evaluating all nodes of *bitgraph*: A dict that maps each
+    evaluated node mask to its k-profile. Unlike the function, the table can be passed to other processes.
+
+    :param max_subsets: Bound the cost of the dynamic programming by the number of enumerated clusters (see
+        :func:`subset_profiles`)
+    :return: The table, or None if the cost exceeds *max_subsets*
+    """
+    memo = {}
+    if subset_profiles(bitgraph, memo, max_subsets)(bitgraph.all_nodes) is None:
+        return None
+    return memo
+
+
+def multiply_profiles(first, second):
+    """
+    Multiply two k-profiles as polynomials in :math:`k`
+    """
+    result = [0] * (len(first) + len(second) - 1)
+    for i, a in enumerate(first):
+        if not a:
+            continue
+        for j, b in enumerate(second):
+            result[i + j] += a * b
+    return result
+
+
+def biconnected_blocks(bitgraph):
+    """
+    The node masks of the blocks (biconnected components and bridges) of *bitgraph*.
+    Isolated nodes do not belong to any block.
+    """
+    graph = Graph()
+    graph.add_nodes_from(range(bitgraph.order()))
+    graph.add_edges_from(bitgraph.index_edges())
+    return [sum(1 << idx for idx in block) for block in biconnected_components(graph)]
+
+
+def decomposed_profile(graph, counter):
+    """
+    Compute the k-profile of *graph* from the k-profiles of its blocks (see :func:`biconnected_blocks`).
+
+    A connected partition of a graph splits into independent connected partitions of its blocks: Two blocks
+    share at most one cut node, and the clusters containing the cut node are merged. Hence, the k-profile of
+    a graph with :math:`c` connected components is :math:`k^c` times the product of the block profiles, each
+    divided by :math:`k` (the cluster of the shared node counts only once).
+
+    :param graph: A NetworkX graph or a :class:`BitGraph`, it may be disconnected
+    :param counter: A function that returns the k-profile of a connected graph (e.g. :func:`subset_dp_profile`)
+    :return: The k-profile
+    """
+    bitgraph = BitGraph.from_graph(graph)
+    profile = [0] * len(bitgraph.components()) + [1]  # k^c
+    block_profiles = {}  # Identically labelled blocks (e.g. all bridges) are counted only once
+
+    for block in biconnected_blocks(bitgraph):
+        subgraph = bitgraph.subgraph(block)
+        key = subgraph.adjacency
+        if key not in block_profiles:
+            block_profiles[key] = counter(subgraph)[1:]  # Divided by k
+        profile = multiply_profiles(profile, block_profiles[key])
+
+    return profile
@@ -7,8 +7,26 @@ edge can be merged.
 """
 from __future__ import print_function, division, absolute_import, unicode_literals
 
+from bisect import insort
+from functools import partial
+from multiprocessing import Pool
+import os
+import sys
+import tempfile
+import time
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
 from networkx import Graph
-from sympy.functions.combinatorial.numbers import bell, stirling, binomial
+
+from bitgraph import BitGraph, popcount
+from combinatorics import bell, stirling, binomial
+from counting import connected_subsets, decomposed_profile, subset_profiles
+from levelstore import ExternalLevelStore, read_partitions, write_partitions
+from symmetry import OrbitStore
 
 
 class fset(frozenset):
@@ -57,57 +75,250 @@ def freeze(x):
 
 
 class SearchSpaceNode(object):
-    def __init__(self, g):
-        # Create a new graph with 'frozen' nodes (i.e. the nodes are frozensets)
-        self._graph = Graph()
-        for edge in g.edges:
-            s, t = sorted(edge)
-            self._graph.add_edge(freeze(s), freeze(t))
-        for node in g.nodes:
-            self._graph.add_node(freeze(node))
+    """
+    A partition of the nodes of a graph into connected clusters.
+    Each cluster is a bit mask over the nodes of the underlying :class:`BitGraph`; the partition itself is the
+    sorted tuple of these masks, which is a canonical representation. The partition induced (quotient) graph is
+    not stored, but derived from the cluster masks when needed.
+    The hash of the cluster tuple is computed once on creation and serves as a cheap first test for equality.
+    """
+    __slots__ = ('_bitgraph', '_blocks', '_hash')
+
+    def __init__(self, bitgraph, blocks=None):
+        """
+        :param bitgraph: The graph that is partitioned
+        :param blocks: Sorted tuple of cluster masks. If not provided, each node is its own cluster.
+        """
+        self._bitgraph = bitgraph
+        if blocks is None:
+            blocks = tuple(1 << idx for idx in range(bitgraph.order()))
+        self._blocks = blocks
+        self._hash = hash(blocks)
 
     def __hash__(self):
-        # This only takes edges into account, no other attributes (e.g. weights)!
-        # IMPORTANT: Sorting, as we use frozen sets as nodes
-        return hash(tuple(sorted(tuple(tuple(sorted(e)) for e in self._graph.edges))))
+        return self._hash
 
     def __eq__(self, other):
-        return self.graph.edges == other.graph.edges
+        return self._hash == other._hash and self._blocks == other._blocks
+
+    def merged(self, i, j):
+        """
+        The partition that results from merging the clusters with the indices *i* and *j*, :math:`i < j`
+        """
+        blocks = self._blocks
+        merged = blocks[i] | blocks[j]
+        new_blocks = list(blocks)
+        del new_blocks[j]
+        del new_blocks[i]
+        insort(new_blocks, merged)
+        return SearchSpaceNode(self._bitgraph, tuple(new_blocks))
+
+    @property
+    def blocks(self):
+        return self._blocks
+
+    @property
+    def bitgraph(self):
+        return self._bitgraph
+
+    @property
+    def num_clusters(self):
+        return len(self._blocks)
+
+    def quotient_edges(self):
+        """
+        Iterate over all pairs :math:`(i, j)`, :math:`i < j`, of cluster indices where the clusters are
+        connected by at least one edge.
+        """
+        blocks = self._blocks
+        num_blocks = len(blocks)
+        for i in range(num_blocks - 1):
+            neighbours = self._bitgraph.neighbourhood(blocks[i])
+            for j in range(i + 1, num_blocks):
+                if neighbours & blocks[j]:
+                    yield i, j
+
+    @property
+    def num_edges(self):
+        """
+        The number of edges of the partition induced graph
+        """
+        return sum(1 for _ in self.quotient_edges())
 
     @property
     def graph(self):
-        return self._graph
+        """
+        The partition induced graph with 'frozen' nodes (i.e. the nodes are frozensets of the original nodes).
+        It is created on each access, so use it for inspection only.
+        """
+        clusters = [fset(self._bitgraph.labels(block)) for block in self._blocks]
+        graph = Graph()
+        graph.add_nodes_from(clusters)
+        graph.add_edges_from((clusters[i], clusters[j]) for i, j in self.quotient_edges())
+        return graph
 
     def expand(self):
         """
         This generates all the partitions that result from merging two existing clusters connected by an edge.
         """
-        for edge in self._graph.edges:
-            new_graph = Graph()
-            s, t = edge  # The edge that connects two nodes to be joined
+        for i, j in self.quotient_edges():
+            yield self.merged(i, j)
 
-            new_node = s.union(t)  # Create the new node
+    def canonical_children(self):
+        """
+        Get the children of this partition whose canonical parent (see :meth:`canonical_parent`) it is.
+        Each partition of the next level is the child of exactly one partition, so no deduplication is needed.
 
-            new_graph.add_node(new_node)  # Add the new node, as possibly no edges remain
+        :return: A tuple *(children, candidates)* where *candidates* is the number of merges that were tested
+            against the canonical parent rule. :meth:`expand` generates a child for each quotient edge instead.
+        """
+        blocks = self._blocks
+        non_singletons = [block for block in blocks if block & (block - 1)]  # Sorted as well
+        children = []
+        candidates = 0
+
+        for i, j in self.quotient_edges():
+            if blocks[j] & (blocks[j] - 1) == 0:  # If both are single nodes, the higher one is split off
+                single, other = blocks[j], blocks[i]
+            elif blocks[i] & (blocks[i] - 1) == 0:
+                single, other = blocks[i], blocks[j]
+            else:  # The canonical parent splits off a single node
+                continue
+
+            candidates += 1
+            merged = single | other
+            # The merged cluster must be the smallest non-singleton cluster of the child
+            smallest_other = next((block for block in non_singletons if block != other), None)
+            if smallest_other is not None and smallest_other < merged:
+                continue
+            # The single node must be the highest node whose removal leaves the merged cluster connected
+            if merged & ~(2 * single - 1) and self._split_node(merged) != single:
+                continue
+
+            children.append(self.merged(i, j))
+
+        return children, candidates
+
+    def _split_node(self, cluster):
+        """
+        The highest node (as mask) of the connected *cluster* whose removal leaves it connected
+        """
+        node = 1 << (cluster.bit_length() - 1)
+        while not self._bitgraph.is_connected(cluster & ~node):
+            node >>= 1
+            while not node & cluster:
+                node >>= 1
+        return node
+
+    def canonical_parent(self):
+        """
+        The canonical parent partition: The highest node, whose removal leaves the smallest non-singleton cluster
+        connected, is split off. A partition that consists of singletons only has no parent (None).
+        """
+        cluster = next((block for block in self._blocks if block & (block - 1)), None)
+        if cluster is None:
+            return None
 
-            for e in self._graph.edges:
-                if edge == e:
-                    continue
+        node = self._split_node(cluster)
+        new_blocks = [block for block in self._blocks if block != cluster] + [cluster & ~node, node]
+        return SearchSpaceNode(self._bitgraph, tuple(sorted(new_blocks)))
 
-                a, b = e
-                if a in edge:
-                    new_graph.add_edge(new_node, b)
-                elif b in edge:
-                    new_graph.add_edge(a, new_node)
-                else:  # Just add the existing edge
-                    new_graph.add_edge(*e)
+    def __str__(self):
+        return '|'.join(map(str, sorted(fset(self._bitgraph.labels(block)) for block in self._blocks)))
 
-            assert new_graph.order() == self._graph.order() - 1
 
-            yield SearchSpaceNode(new_graph)
+def _expand_chunk(bitgraph, chunk, num_shards, canonical=False):
+    """
+    Expand all partitions (cluster mask tuples) in *chunk* and distribute the children into *num_shards* shards
+    by their hash. Duplicates within the chunk are removed already.
 
-    def __str__(self):
-        return '|'.join(map(str, sorted(self._graph.nodes)))
+    :return: A tuple *(shards, candidates)*, see :meth:`SearchSpaceLevel.expand`
+    """
+    shards = [set() for _ in range(num_shards)]
+    candidates = 0
+    for blocks in chunk:
+        if canonical:
+            children, num = SearchSpaceNode(bitgraph, blocks).canonical_children()
+        else:
+            children = list(SearchSpaceNode(bitgraph, blocks).expand())
+            num = len(children)
+        candidates += num
+        for child in children:
+            shards[hash(child.blocks) % num_shards].add(child.blocks)
+    return shards, candidates
+
+
+def _new_file(directory):
+    fd, path = tempfile.mkstemp(dir=directory)
+    os.close(fd)
+    return path
+
+
+def _expand_shard(bitgraph, path, num_shards, canonical, directory):
+    """
+    Expand the partitions of the shard file *path* (see :func:`levelstore.write_partitions`) and write the children
+    into one part file per shard of the next level. The shard file is deleted.
+
+    :return: A tuple *(paths of the part files, candidates)*
+    """
+    parts, candidates = _expand_chunk(bitgraph, read_partitions(path, bitgraph.order()), num_shards, canonical)
+    os.remove(path)
+    paths = []
+    for part in parts:
+        paths.append(_new_file(directory))
+        write_partitions(paths[-1], part, bitgraph.order())
+    return paths, candidates
+
+
+def _merge_shard(bitgraph, paths, directory, keep):
+    """
+    Merge the part files *paths* of a single shard that were written by the expansions of different shards of the
+    previous level, which removes all duplicates of the shard. The shard is written into a new shard file, the part
+    files are deleted.
+
+    :return: A tuple *(path of the shard file, size of the shard, shard if keep else None)*
+    """
+    shard = set()
+    for path in paths:
+        shard.update(read_partitions(path, bitgraph.order()))
+        os.remove(path)
+    shard_path = _new_file(directory)
+    write_partitions(shard_path, shard, bitgraph.order())
+    return shard_path, len(shard), shard if keep else None
+
+
+class PartitionShards(object):
+    """
+    The partitions of a level that was expanded in parallel: disjoint sets (shards) of cluster mask tuples. The
+    shards are never merged, iteration creates the :class:`SearchSpaceNode` objects on the fly.
+    """
+
+    def __init__(self, bitgraph, shards):
+        self._bitgraph = bitgraph
+        self._shards = shards
+
+    @property
+    def shards(self):
+        return self._shards
+
+    def __len__(self):
+        return sum(len(shard) for shard in self._shards)
+
+    def __iter__(self):
+        for shard in self._shards:
+            for blocks in shard:
+                yield SearchSpaceNode(self._bitgraph, blocks)
+
+
+class PartitionList(list):
+    """
+    A container for partitions that are known to be unique, i.e. that need no deduplication
+    """
+    add = list.append
+
+
+# Levels with fewer partitions are expanded serially even if a process pool is available
+PARALLEL_MIN_PARTITIONS = 10000
 
 
 class SearchSpaceLevel(object):
@@ -115,21 +326,41 @@ class SearchSpaceLevel(object):
     _previous = None
     _level = 0
     _num_partitions = None
+    _num_candidates = None
+    _seconds = None
+    _shard_files = None  # Parallel expansion: (bit graph, paths of the shard files)
 
-    def __init__(self, graph=None, previous=None):
+    def __init__(self, graph=None, previous=None, num_partitions=None, store=None):
+        """
+        Create the first level of the search space of *graph* or the level following *previous*.
+        If *num_partitions* is given, the level is created compressed, i.e. only the number of partitions
+        is known (e.g. because it was counted instead of enumerated).
+
+        The partitions are kept in a container that is created by calling *store* (default: :class:`set`), e.g.
+        a :class:`levelstore.ExternalLevelStore`. Following levels use the store of their previous level.
+        """
         if graph and previous:
             raise ValueError('Only one of graph and previous allowed')
         elif not graph and not previous:
             raise ValueError('Either graph or previous needed')
 
-        self._nodes = set()
+        if store is None:
+            store = previous._store if previous else set
+        self._store = store
+        self._nodes = store()
 
         if graph:
-            self._nodes.add(SearchSpaceNode(graph))
+            self._nodes.add(SearchSpaceNode(BitGraph.from_graph(graph)))
         elif previous:
             self._previous = previous
             self._level = previous.level + 1
 
+        if num_partitions is not None:
+            if previous:
+                previous._next = self
+            self._num_partitions = num_partitions
+            self._nodes = None
+
     @property
     def level(self):
         return self._level
@@ -141,6 +372,21 @@ class SearchSpaceLevel(object):
         else:
             return len(self._nodes)
 
+    @property
+    def num_candidates(self):
+        """
+        The number of children that were generated (or considered) while expanding the previous level.
+        The difference to :attr:`num_partitions` is the redundancy of the expansion. None if unknown.
+        """
+        return self._num_candidates
+
+    @property
+    def seconds(self):
+        """
+        The wall time in seconds of the expansion of the previous level that created this level. None if unknown.
+        """
+        return self._seconds
+
     @property
     def nodes(self):
         return self._nodes
@@ -148,18 +394,77 @@ class SearchSpaceLevel(object):
     def add_node(self, node):
         self._nodes.add(node)
 
-    def expand(self):
+    def expand(self, pool=None, num_shards=1, canonical=False, keep=True, directory=None):
+        """
+        Create the next level from all partitions of this level.
+        If a process *pool* is given, the partitions are split into *num_shards* shards that are expanded in
+        parallel. The children are hash-partitioned into *num_shards* shards, so each shard is deduplicated
+        independently of the others and the shards of the next level are disjoint. The workers exchange the shards
+        by files in *directory* (see :func:`_expand_shard` and :func:`_merge_shard`), the parent process only
+        passes their paths on. The next level keeps its shards as :class:`PartitionShards` only if *keep* is True,
+        otherwise just their sizes.
+
+        If *canonical* is True, each partition only generates the children it is the canonical parent of
+        (see :meth:`SearchSpaceNode.canonical_children`), so no partition is generated twice.
+        """
         if self._next:
             raise ValueError('Already expanded')
 
+        start = time.perf_counter()
         self._next = SearchSpaceLevel(previous=self)
+        candidates = 0
 
-        for node in self._nodes:
-            for new_node in node.expand():
-                self._next.add_node(new_node)  # Set property assures no duplicate nodes
-
+        if isinstance(self._nodes, OrbitStore):
+            candidates = self._nodes.expand_into(self._next._nodes)
+        elif self._shard_files is not None or (pool is not None and num_shards > 1 and
+                                               len(self._nodes) >= PARALLEL_MIN_PARTITIONS):
+            candidates = self._expand_parallel(pool, num_shards, canonical, keep, directory)
+        else:
+            for node in self._nodes:
+                if canonical:
+                    children, num = node.canonical_children()
+                    candidates += num
+                else:
+                    children = node.expand()
+                for new_node in children:
+                    if not canonical:
+                        candidates += 1
+                    self._next.add_node(new_node)  # Set property assures no duplicate nodes
+
+        self._next._num_candidates = candidates
+        self._next._seconds = time.perf_counter() - start
         return self._next
 
+    def _expand_parallel(self, pool, num_shards, canonical, keep, directory):
+        """
+        Create the shards of the next level from the shard files of this level (see :meth:`expand`)
+
+        :return: The number of candidates
+        """
+        if self._shard_files is None:  # The first parallel level: Its partitions are written in chunks
+            bitgraph = next(iter(self._nodes)).bitgraph
+            parents = [node.blocks for node in self._nodes]
+            paths = []
+            for idx in range(num_shards):
+                paths.append(_new_file(directory))
+                write_partitions(paths[-1], parents[idx::num_shards], bitgraph.order())
+            self._shard_files = bitgraph, paths
+
+        bitgraph, paths = self._shard_files
+        self._shard_files = None
+        expanded = pool.starmap(_expand_shard, [(bitgraph, path, num_shards, canonical, directory)
+                                                for path in paths])
+        merged = pool.starmap(_merge_shard, [(bitgraph, [part_paths[idx] for part_paths, _ in expanded], directory,
+                                              keep) for idx in range(num_shards)])
+
+        if keep:
+            self._next._nodes = PartitionShards(bitgraph, [shard for _, _, shard in merged])
+        else:
+            self._next._nodes = None
+            self._next._num_partitions = sum(size for _, size, _ in merged)
+        self._next._shard_files = bitgraph, [path for path, _, _ in merged]
+        return sum(num for _, num in expanded)
+
     def compress(self):
         """
         Discard the list of search space nodes (=partitions) and only keep the number of nodes.
@@ -172,41 +477,149 @@ class SearchSpaceLevel(object):
     def mean_num_edges(self):
         if self._nodes is None:
             raise ValueError('The search space is compressed, computation impossible')
-        return sum(n.graph.number_of_edges() for n in self._nodes) / len(self.nodes)
+        if isinstance(self._nodes, OrbitStore):
+            return sum(n.num_edges * size for n, size in self._nodes.orbits()) / len(self._nodes)
+        return sum(n.num_edges for n in self._nodes) / len(self.nodes)
 
 
 class SearchSpace(object):
     _levels = None
 
-    def __init__(self, graph, compress=True):
+    def __init__(self, graph, compress=True, counter=None, decompose=False, jobs=1, memory_budget=None,
+                 tmp_dir=None, canonical=False, stats=None, symmetric=False):
         """
         Create the search space for the given *graph*. If *compress* is True, each level in the search
         space will be compressed after it was expanded. This means the actual partitions are deleted and
         only the number of partitions in this level is saved.
+
+        If a *counter* is provided, the search space is not enumerated. Instead, *counter* is called with
+        the graph and must return its k-profile (see :mod:`counting`); all levels are compressed then.
+
+        If *decompose* is True, the graph is split into its blocks (biconnected components and bridges). Each
+        block is enumerated (or counted by *counter*) on its own and the results are combined. Only the
+        number of partitions is known then, so compression is mandatory as well.
+
+        If *jobs* is larger than 1, large levels are expanded by this number of worker processes
+        (see :meth:`SearchSpaceLevel.expand`). The workers exchange the partitions by files in *tmp_dir*.
+
+        If a *memory_budget* (in bytes) is given, the partitions of each level are stored on disk in *tmp_dir*
+        (see :class:`levelstore.ExternalLevelStore`) and only about this amount of memory is used per level.
+
+        If *canonical* is True, each partition is generated exactly once (see
+        :meth:`SearchSpaceNode.canonical_children`) and the levels need no deduplication.
+
+        If *symmetric* is True, each level only keeps one partition per orbit under the automorphisms of the graph
+        together with the orbit size (see :class:`symmetry.OrbitStore`). The number of partitions per level stays
+        exact, but the nodes of a level are the representatives only.
+
+        If *stats* is given, it is called with the record of each enumerated level (see :meth:`level_stats`) as soon
+        as the level is complete.
         """
+        if (counter is not None or decompose) and not compress:
+            raise ValueError('A counter only provides the number of partitions, compression is mandatory')
+        if memory_budget is not None and jobs > 1:
+            raise ValueError('Levels on disk cannot be expanded in parallel')
+        if jobs > 1 and len(graph) > 256:
+            raise ValueError('The workers exchange records that are limited to 256 clusters')
+        if symmetric and (counter is not None or decompose or jobs > 1 or memory_budget is not None or canonical):
+            raise ValueError('Symmetry reduction is only possible for a serial enumeration in memory')
+
         self._graph = graph
         self._compress = compress
+        self._counter = counter
+        self._decompose = decompose
+        self._jobs = jobs
+        self._memory_budget = memory_budget
+        self._tmp_dir = tmp_dir
+        self._canonical = canonical
+        self._stats = stats
+        self._symmetric = symmetric
+        self._level_stats = []
+        self._num_components = None
 
     def build(self):
         """
         Iteratively build the search space. Call this method only once!
         """
-        first_level = SearchSpaceLevel(graph=self._graph)
-        second_level = first_level.expand()
+        if self._decompose:
+            return self._build_from_profile(decomposed_profile(self._graph, self._counter or enumeration_profile))
+        elif self._counter is not None:
+            return self._build_from_profile(self._counter(self._graph))
+
+        pool = Pool(self._jobs) if self._jobs > 1 else None
+        shard_dir = tempfile.TemporaryDirectory(dir=self._tmp_dir) if pool is not None else None
+
+        if self._memory_budget is not None:
+            bitgraph = BitGraph.from_graph(self._graph)
+            first_level = SearchSpaceLevel(graph=bitgraph, store=partial(ExternalLevelStore, bitgraph,
+                                                                         self._memory_budget, self._tmp_dir))
+        elif self._symmetric:
+            bitgraph = BitGraph.from_graph(self._graph)
+            first_level = SearchSpaceLevel(graph=bitgraph, store=partial(OrbitStore, bitgraph))
+        elif self._canonical:
+            first_level = SearchSpaceLevel(graph=self._graph, store=PartitionList)
+        else:
+            first_level = SearchSpaceLevel(graph=self._graph)
+        self._record_level_stats(first_level)
+        second_level = first_level.expand(canonical=self._canonical)
         self._levels = [first_level, second_level]
+        self._record_level_stats(second_level)
 
         if self._compress:
             first_level.compress()
 
         while self._levels[-1].num_partitions > 1:
-            self._levels.append(self._levels[-1].expand())
+            self._levels.append(self._levels[-1].expand(pool, self._jobs, self._canonical, not self._compress,
+                                                        shard_dir.name if shard_dir is not None else None))
+            self._record_level_stats(self._levels[-1])
 
             if self._compress:
                 self._levels[-2].compress()
 
+        if pool is not None:
+            pool.close()
+            pool.join()
+            shard_dir.cleanup()
+
         if self._compress:
             self._levels[-1].compress()
 
+        if not self._levels[-1].num_partitions:  # Only possible for a single node or without any edges
+            self._levels.pop()
+            self._level_stats.pop()
+
+        return self._levels
+
+    def _record_level_stats(self, level):
+        num_partitions = level.num_partitions
+        num_candidates = level.num_candidates
+        record = {'level': level.level,
+                  'k': self.num_nodes - level.level,
+                  'seconds': level.seconds,
+                  'num_candidates': num_candidates,
+                  'num_partitions': num_partitions,
+                  'duplicate_ratio': 1 - num_partitions / num_candidates if num_candidates else None,
+                  'max_rss': max_rss()}
+        if self._symmetric:
+            record['num_orbits'] = level.nodes.num_orbits
+            record['duplicate_ratio'] = 1 - record['num_orbits'] / num_candidates if num_candidates else None
+        self._level_stats.append(record)
+        if self._stats is not None:
+            self._stats(record)
+
+    def _build_from_profile(self, counts):
+        """
+        Create compressed levels from the k-profile *counts* (``counts[k]`` is the number of k-partitions).
+        """
+        first_level = SearchSpaceLevel(graph=self._graph)
+        first_level.compress()
+        self._levels = [first_level]
+
+        for k in range(self.num_nodes - 1, 0, -1):
+            if not counts[k]:
+                break
+            self._levels.append(SearchSpaceLevel(previous=self._levels[-1], num_partitions=counts[k]))
+
         return self._levels
 
     @property
@@ -229,8 +642,26 @@ class SearchSpace(object):
     def num_levels(self):
         return len(self._levels)
 
+    @property
+    def num_components(self):
+        if self._num_components is None:
+            self._num_components = len(BitGraph.from_graph(self._graph).components())
+        return self._num_components
+
+    def profile(self):
+        """
+        Get the k-profile of the built search space, i.e. a list where the k-th entry is the number of
+        partitions into :math:`k` clusters.
+
+        :return:
+        """
+        counts = [0] * (self.num_nodes + 1)
+        for level in self.levels:
+            counts[self.num_nodes - level.level] = level.num_partitions
+        return counts
+
     def bell(self):
-        return int(bell(self.num_nodes))
+        return bell(self.num_nodes)
 
     def num_partitions_ub(self):
         """
@@ -244,11 +675,32 @@ class SearchSpace(object):
     def num_partitions_lb(self):
         """
         Get the exact absolute lower bound for the number of partitions.
-        This is just the number of partitions of a tree of :math:`n` nodes: :math:`2^{n-1}`.
+        This is just the number of partitions of a tree of :math:`n` nodes: :math:`2^{n-1}`
+        (of a forest with :math:`c` trees for disconnected graphs: :math:`2^{n-c}`).
 
         :return:
         """
-        return 2 ** (self.num_nodes - 1)
+        return 2 ** (self.num_nodes - self.num_components)
+
+    def num_candidates(self):
+        """
+        The total number of children that were generated (or considered) during the expansion of all levels.
+        None if the search space was counted instead of enumerated.
+        """
+        if any(level.num_candidates is None for level in self.levels[1:]):
+            return None
+        return sum(level.num_candidates for level in self.levels[1:])
+
+    def level_stats(self):
+        """
+        Get the statistics of each enumerated level: the wall time of its expansion (*seconds*), the number of
+        generated children (*num_candidates*, see :attr:`SearchSpaceLevel.num_candidates`), the number of unique
+        partitions (*num_partitions*), the fraction of the children that were duplicates or, with canonical
+        generation, rejected (*duplicate_ratio*) and the peak resident memory of the process so far in bytes
+        (*max_rss*). With symmetry reduction, the number of stored representatives (*num_orbits*) is added and the
+        duplicate ratio refers to them. Empty if the search space was counted instead of enumerated.
+        """
+        return self._level_stats
 
     def num_partitions(self, level=None):
         if level is None:
@@ -257,7 +709,7 @@ class SearchSpace(object):
             return self.levels[level].num_partitions
 
     def stirling(self, level):
-        return int(stirling(self.num_nodes, self.num_nodes - level))
+        return stirling(self.num_nodes, self.num_nodes - level)
 
     def num_k_partitions_ub(self, level):
         """
@@ -272,12 +724,13 @@ class SearchSpace(object):
     def num_k_partitions_lb(self, level):
         """
         Get the lower bound for the number of :math:`k` partitions.
-        This is :math:`\binom{n-1}{k-1}` with :math:`k=n-l`; :math:`l` is the level.
+        This is :math:`\\binom{n-1}{k-1}` with :math:`k=n-l`; :math:`l` is the level
+        (:math:`\\binom{n-c}{k-c}` for disconnected graphs with :math:`c` connected components).
 
         :param level:
         :return:
         """
-        return binomial(self.num_nodes - 1, self.num_nodes - level - 1)
+        return binomial(self.num_nodes - self.num_components, self.num_nodes - level - self.num_components)
 
     def print_results(self, print_nodes=False):
         print('Bell number = {}'.format(self.bell()))
@@ -323,3 +776,168 @@ class SearchSpace(object):
                             })
 
         return records
+
+
+def max_rss():
+    """
+    The peak resident set size of this process in bytes (None if unknown)
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024  # Linux reports KiB
+
+
+def enumeration_profile(graph):
+    """
+    Get the k-profile of *graph* (see :meth:`SearchSpace.profile`) by enumerating its search space.
+    """
+    search_space = SearchSpace(graph)
+    search_space.build()
+    return search_space.profile()
+
+
+def iter_partitions(graph, k):
+    """
+    Lazily generate all connected partitions of *graph* into *k* clusters as :class:`SearchSpaceNode` objects,
+    without building the search space. Only the current path of a depth-first search is kept in memory.
+
+    The cluster of the lowest remaining node is chosen among the connected subsets of the remaining nodes (see
+    :func:`counting.connected_subsets`), so each partition is generated exactly once. The remaining nodes with
+    :math:`c` connected components can be split into :math:`j` connected clusters iff
+    :math:`c \\leq j \\leq |remaining|`; all other choices are skipped, so the search never runs into a dead end.
+
+    :param graph: A NetworkX graph or a :class:`bitgraph.BitGraph`
+    """
+    bitgraph = BitGraph.from_graph(graph)
+
+    def feasible(remaining, num_clusters):
+        return len(bitgraph.components(remaining)) <= num_clusters <= popcount(remaining)
+
+    all_nodes = bitgraph.all_nodes
+    if not all_nodes or not feasible(all_nodes, k):
+        return
+
+    def cluster_candidates(remaining, num_clusters):
+        """
+        The candidates for the cluster of the lowest remaining node; the other clusters need a node each
+        """
+        return connected_subsets(bitgraph, remaining & -remaining, remaining, popcount(remaining) - num_clusters + 1)
+
+    # Each stack entry: (remaining nodes, chosen clusters, candidates for the cluster of the lowest remaining node)
+    stack = [(all_nodes, [], cluster_candidates(all_nodes, k))]
+    while stack:
+        remaining, clusters, candidates = stack[-1]
+        cluster = next(candidates, None)
+        if cluster is None:
+            stack.pop()
+            continue
+
+        rest = remaining & ~cluster
+        num_clusters = k - len(clusters) - 1  # Still needed for the rest
+        if not rest:
+            if not num_clusters:
+                yield SearchSpaceNode(bitgraph, tuple(sorted(clusters + [cluster])))
+        elif num_clusters == 1:  # The rest is the last cluster
+            if bitgraph.is_connected(rest):
+                yield SearchSpaceNode(bitgraph, tuple(sorted(clusters + [cluster, rest])))
+        elif feasible(rest, num_clusters):
+            stack.append((rest, clusters + [cluster], cluster_candidates(rest, num_clusters)))
+
+
+class PartitionRanking(object):
+    """
+    Random access to the connected k-partitions of a graph in the order of :func:`iter_partitions`: The *i*-th
+    partition can be created directly (:meth:`unrank`) and the index of a partition can be computed (:meth:`rank`),
+    e.g. to split the partitions into ranges of indices.
+
+    Both follow the choices of :func:`iter_partitions` and skip whole subtrees of the search by the number of
+    partitions of the remaining nodes (see :func:`counting.subset_profiles`). These counts are computed once and
+    kept, so only the candidates for the clusters on the path to a partition are considered per call.
+    """
+
+    def __init__(self, graph, table=None):
+        """
+        :param graph: A NetworkX graph or a :class:`bitgraph.BitGraph`
+        :param table: The counting table of *graph* (see :func:`counting.subset_profile_table`), e.g. computed by
+            another process; computed on demand by default
+        """
+        self._bitgraph = BitGraph.from_graph(graph)
+        self._profile = subset_profiles(self._bitgraph, table)
+
+    @property
+    def bitgraph(self):
+        return self._bitgraph
+
+    def _count(self, remaining, num_clusters):
+        """
+        The number of partitions of the nodes in *remaining* into *num_clusters* connected clusters
+        """
+        profile = self._profile(remaining)
+        return profile[num_clusters] if 0 <= num_clusters < len(profile) else 0
+
+    def _choices(self, remaining, num_clusters):
+        """
+        Iterate over the clusters of the lowest node in *remaining* in the order of :func:`iter_partitions`, as
+        pairs *(cluster, number of partitions of the other nodes into the other clusters)* (only non-zero numbers)
+        """
+        max_size = popcount(remaining) - num_clusters + 1
+        for cluster in connected_subsets(self._bitgraph, remaining & -remaining, remaining, max_size):
+            num = self._count(remaining & ~cluster, num_clusters - 1)
+            if num:
+                yield cluster, num
+
+    def num_partitions(self, k):
+        """
+        The number of connected partitions into *k* clusters, i.e. the number of valid indices for *k*
+        """
+        return self._count(self._bitgraph.all_nodes, k)
+
+    def unrank(self, index, k):
+        """
+        The connected partition into *k* clusters with the given *index*
+
+        :return: A :class:`SearchSpaceNode`
+        """
+        if not 0 <= index < self.num_partitions(k):
+            raise IndexError('Partition index out of range')
+
+        remaining = self._bitgraph.all_nodes
+        blocks = []
+        while remaining:
+            for cluster, num in self._choices(remaining, k - len(blocks)):
+                if index < num:
+                    break
+                index -= num
+            blocks.append(cluster)
+            remaining &= ~cluster
+
+        return SearchSpaceNode(self._bitgraph, tuple(sorted(blocks)))
+
+    def rank(self, node):
+        """
+        The index of the connected partition *node* (a :class:`SearchSpaceNode` of the same graph) among the
+        partitions with the same number of clusters
+        """
+        blocks = node.blocks
+        union = 0
+        for block in blocks:
+            union |= block
+        # The sum equals the union iff the blocks are disjoint
+        if union != self._bitgraph.all_nodes or sum(blocks) != union or \
+                not all(self._bitgraph.is_connected(block) for block in blocks):
+            raise ValueError('Not a connected partition of the graph')
+
+        remaining = self._bitgraph.all_nodes
+        num_clusters = len(blocks)
+        index = 0
+        while remaining:
+            cluster = next(block for block in blocks if block & remaining & -remaining)
+            for other, num in self._choices(remaining, num_clusters):
+                if other == cluster:
+                    break
+                index += num
+            remaining &= ~cluster
+            num_clusters -= 1
+
+        return index
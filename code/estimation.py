@@ -7,7 +7,9 @@ from __future__ import print_function, division, absolute_import, unicode_litera
 import abc
 import math
 
-from sympy.functions.combinatorial.numbers import stirling, binomial
+import numpy as np
+
+from combinatorics import stirling, binomial
 
 
 def edge_decrease(n, m):
@@ -23,15 +25,111 @@ def edge_decrease(n, m):
     return 2 * m / (n - 1) - 1
 
 
-def estimated_num_edges(n, m, k):
+def num_edges_per_level(n, m, k_min=1):
+    """
+    Compute the expected number of edges of the partition induced graph for all numbers of clusters
+    :math:`k_{min} \\leq k \\leq n` in a single pass (see :func:`edge_decrease`).
+
+    :return: A list whose :math:`k`-th entry is the expected number of edges for :math:`k` clusters
+        (None for :math:`k < k_{min}`)
+    """
+    m_levels = [None] * (n + 1)
     n_level = n
     m_level = m
-    while n_level > k:
+    m_levels[n_level] = m_level
+    while n_level > k_min:
         n_level -= 1
         m_level -= edge_decrease(n_level + 1, m_level)
         assert m_level >= n_level - 1
+        m_levels[n_level] = m_level
+
+    return m_levels
+
+
+def estimated_num_edges(n, m, k):
+    return int(math.ceil(num_edges_per_level(n, m, k)[k]))
+
+
+def _profile_ends(n, m):
+    """
+    A profile (see :meth:`PartitionNumberEstimator.num_partitions_profile`) that only contains the exact values
+    for :math:`k \\in \\{1, n-1, n\\}`: There is exactly one partition into 1 or :math:`n` clusters and each of
+    the :math:`m` edges yields one partition into :math:`n-1` clusters.
+    """
+    profile = [0] * (n + 1)
+    if n > 2:
+        profile[n - 1] = m
+    profile[1] = profile[n] = 1
+    return profile
+
+
+def log_stirling_table(max_n):
+    """
+    The natural logarithms of the Stirling numbers of the second kind :math:`S(n, k)` for
+    :math:`0 \\leq n, k \\leq max_n` as NumPy array (:math:`-\\infty` for :math:`S(n, k) = 0`)
+    """
+    table = np.full((max_n + 1, max_n + 1), -np.inf)
+    table[0, 0] = 0
+    log_k = np.log(np.arange(1, max_n + 1))
+    for n in range(1, max_n + 1):
+        # S(n, k) = k S(n-1, k) + S(n-1, k-1)
+        table[n, 1:n + 1] = np.logaddexp(log_k[:n] + table[n - 1, 1:n + 1], table[n - 1, :n])
+    return table
+
+
+def log_binomial(n, k):
+    """
+    The natural logarithm of :math:`\\binom{n}{k}` for integer arrays *n* and *k* (:math:`-\\infty` outside
+    :math:`0 \\leq k \\leq n`)
+    """
+    n, k = np.broadcast_arrays(np.asarray(n, dtype=int), np.asarray(k, dtype=int))
+    valid = (k >= 0) & (k <= n) & (n >= 0)
+    log_factorials = np.concatenate(([0.], np.cumsum(np.log(np.arange(1, max(n.max(initial=0), 0) + 1)))))
+    n = np.where(valid, n, 0)
+    k = np.where(valid, k, 0)
+    return np.where(valid, log_factorials[n] - log_factorials[k] - log_factorials[n - k], -np.inf)
 
-    return int(math.ceil(m_level))
+
+def num_edges_per_level_batch(n, m, k_min=1):
+    """
+    Vectorized :func:`num_edges_per_level` for the arrays *n* and *m* of equal length.
+
+    :return: An array with one row per graph; column :math:`k` is the expected number of edges for
+        :math:`k` clusters (NaN outside :math:`k_{min} \\leq k \\leq n`)
+    """
+    levels = np.full((len(n), n.max() + 1), np.nan)
+    rows = np.arange(len(n))
+    n_level = n.copy()
+    m_level = m.astype(float)
+    levels[rows, n_level] = m_level
+    active = n_level > k_min
+    while active.any():
+        m_level = np.where(active, m_level - (2 * m_level / np.maximum(n_level - 1, 1) - 1), m_level)
+        n_level = np.where(active, n_level - 1, n_level)
+        levels[rows[active], n_level[active]] = m_level[active]
+        active = n_level > k_min
+    return levels
+
+
+def _log_profile_ends(n, m):
+    """
+    Vectorized :func:`_profile_ends` in log-space, see :meth:`PartitionNumberEstimator.log_profiles`
+    """
+    rows = np.arange(len(n))
+    profiles = np.full((len(n), n.max() + 1), -np.inf)
+    profiles[rows, 1] = 0
+    profiles[rows, n] = 0
+    large = n > 2
+    profiles[rows[large], n[large] - 1] = np.log(m[large])
+    return profiles
+
+
+def _inner_columns(n):
+    """
+    The mask of the columns :math:`2 \\leq k \\leq n-2` of log profiles that are not fixed by :func:`_log_profile_ends`
+    """
+    k = np.arange(n.max() + 1)
+    return (k >= 2) & (k <= n[:, np.newaxis] - 2)
 
 
 class PartitionNumberEstimator(object, metaclass=abc.ABCMeta):
@@ -39,9 +137,68 @@ class PartitionNumberEstimator(object, metaclass=abc.ABCMeta):
     Abstract base class of all estimators
     """
     @abc.abstractmethod
+    def num_partitions_profile(self, n, m):
+        """
+        Estimate the number of :math:`k`-partitions for all :math:`k` in a single pass.
+
+        :return: A list whose :math:`k`-th entry is the estimate for :math:`k` clusters (the 0-th entry is 0)
+        """
+        pass
+
     def num_partitions(self, n, m, k=None):
+        profile = self.num_partitions_profile(n, m)
+        if k is None:
+            return self.total(profile)
+        return profile[k]
+
+    def total(self, profile):
+        """
+        The estimated total number of partitions from a profile (see :meth:`num_partitions_profile`)
+        """
+        return sum(profile[1:])
+
+    @abc.abstractmethod
+    def log_profiles(self, n, m):
+        """
+        Vectorized version of :meth:`num_partitions_profile` in log-space.
+
+        :param n: Array of the numbers of nodes
+        :param m: Array of the numbers of edges (same length as *n*)
+        :return: An array with one row per graph and :math:`\\max(n) + 1` columns; column :math:`k` holds the
+            natural logarithm of the estimate for :math:`k` clusters (:math:`-\\infty` for :math:`k = 0` and
+            :math:`k > n`)
+        """
         pass
 
+    def num_partitions_batch(self, n, m, k=None):
+        """
+        Estimate the number of partitions of many graphs at once.
+        *n*, *m* and *k* are arrays (or scalars) that are broadcast against each other. If *k* is None, the
+        total number of partitions is estimated.
+
+        :return: The :math:`\\log_{10}` of the estimates as array of the broadcast shape. Estimates that are not
+            positive (possible for some estimators and dense graphs) are NaN.
+        """
+        if k is None:
+            n, m = np.broadcast_arrays(np.asarray(n, dtype=int), np.asarray(m, dtype=float))
+        else:
+            n, m, k = np.broadcast_arrays(np.asarray(n, dtype=int), np.asarray(m, dtype=float),
+                                          np.asarray(k, dtype=int))
+        shape = n.shape
+        n = n.ravel()
+        if not len(n):
+            return np.zeros(shape)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            profiles = self.log_profiles(n, m.ravel())
+
+            if k is None:
+                result = np.logaddexp.reduce(profiles, axis=1)
+            else:
+                result = profiles[np.arange(len(n)), k.ravel()]
+
+        return (result / math.log(10)).reshape(shape)
+
     @abc.abstractproperty
     def name(self):
         pass
@@ -74,17 +231,48 @@ class MeanNeighborsEstimator(PartitionNumberEstimator):
         m_k = self.expected_num_edges(n, m, k)
         return 2 * m_k / k
 
-    def num_partitions(self, n, m, k=None):
-        if k is None:
-            return sum(self.num_partitions(n, m, i) for i in range(1, n + 1))
-
-        if k in (1, n):
-            return 1
-        elif k == n - 1:
-            return m
-
-        return min(self.expected_node_degree(n, m, k), k) * self.num_partitions(n - 1, m, k) + \
-               self.num_partitions(n - 1, m, k - 1)
+    def num_partitions_profile(self, n, m):
+        # The recursion reduces n, but keeps m: build the profiles of all n' <= n bottom up
+        profile = [0, 1]
+        for n_sub in range(2, n + 1):
+            previous = profile
+            profile = [0] * (n_sub + 1)
+            profile[1] = profile[n_sub] = 1
+            if n_sub > 2:
+                profile[n_sub - 1] = m
+
+            m_levels = num_edges_per_level(n_sub, m, 3) if n_sub > 4 else None
+            for k in range(2, n_sub - 1):
+                m_k = 1 if k == 2 else int(math.ceil(m_levels[k]))  # See expected_num_edges
+                profile[k] = min(2 * m_k / k, k) * previous[k] + previous[k - 1]
+
+        return profile
+
+    def log_profiles(self, n, m):
+        max_n = n.max()
+        k = np.arange(max_n + 1)
+        profiles = np.full((len(n), max_n + 1), -np.inf)
+        profiles[:, 1] = 0
+        for n_sub in range(2, max_n + 1):
+            active = n >= n_sub
+            previous = profiles[active]
+            current = np.full_like(previous, -np.inf)
+            current[:, 1] = current[:, n_sub] = 0
+            if n_sub > 2:
+                current[:, n_sub - 1] = np.log(m[active])
+
+            if n_sub > 3:
+                inner = np.arange(2, n_sub - 1)
+                m_k = np.ones((len(previous), len(inner)))
+                if n_sub > 4:
+                    m_levels = num_edges_per_level_batch(np.full(len(previous), n_sub), m[active], 3)
+                    m_k[:, 1:] = np.ceil(m_levels[:, 3:n_sub - 1])
+                factor = np.minimum(2 * m_k / inner, inner)
+                current[:, inner] = np.logaddexp(np.log(factor) + previous[:, inner], previous[:, inner - 1])
+
+            profiles[active] = current
+        profiles[k > n[:, np.newaxis]] = -np.inf
+        return profiles
 
 
 class DensityEstimator(PartitionNumberEstimator):
@@ -97,28 +285,32 @@ class DensityEstimator(PartitionNumberEstimator):
     def name(self):
         return 'density_estimator'
 
-    def num_partitions(self, n, m, k=None):
-        if k is None:
-            return sum(self.num_partitions(n, m, i) for i in range(1, n + 1))
+    def num_partitions_profile(self, n, m):
+        profile = [0] * (n + 1)
+        profile[1] = profile[n] = 1
 
-        if k in (1, n):
-            return 1
+        # Estimated average number of edges of the partition induced graph for each number of nodes
+        m_levels = num_edges_per_level(n, m, 2)
+        for k in range(2, n):
+            # Maximum number of edges of the partition induced graph
+            n_level_choose2 = k * (k - 1) / 2
+            # Average estimated density of the partition induced graph
+            rho_level = m_levels[k] / n_level_choose2
 
-        # Number of nodes of the partition induced graph
-        # Estimated average number of edges of the partition induced graph
-        n_level = n
-        m_level = m
-        while n_level > k:
-            n_level -= 1
-            m_level -= edge_decrease(n_level + 1, m_level)
-            assert m_level >= n_level - 1
+            profile[k] = stirling(n, k) * rho_level
 
-        # Maximum number of edges of the partition induced graph
-        n_level_choose2 = n_level * (n_level - 1) / 2
-        # Average estimated density of the partition induced graph
-        rho_level = m_level / n_level_choose2
+        return profile
 
-        return stirling(n, k) * rho_level
+    def log_profiles(self, n, m):
+        profiles = _log_profile_ends(n, m)
+        log_stirling = log_stirling_table(n.max())[n]
+
+        k = np.arange(n.max() + 1)
+        inner = (k >= 2) & (k <= n[:, np.newaxis] - 1)  # Includes k = n-1
+        m_levels = num_edges_per_level_batch(n, m, 2)
+        estimates = log_stirling + np.log(m_levels) - np.log(k * (k - 1) / 2)
+        profiles[inner] = estimates[inner]
+        return profiles
 
 
 class StirlingRatioEstimator(PartitionNumberEstimator):
@@ -126,19 +318,27 @@ class StirlingRatioEstimator(PartitionNumberEstimator):
     def name(self):
         return 'stirling_ratio_estimator'
 
-    def num_partitions(self, n, m, k=None):
-        if k is None:
-            return sum(self.num_partitions(n, m, i) for i in range(1, n + 1))
-
-        if k in (1, n):
-            return 1
+    def num_partitions_profile(self, n, m):
+        profile = _profile_ends(n, m)
 
-        if k == n - 1:
-            return m
+        ub_k_1 = stirling(n, n - 1)
+        for k in range(n - 2, 1, -1):
+            ub_k = stirling(n, k)
+            ratio = float(ub_k / ub_k_1)
+            profile[k] = ratio * profile[k + 1]
+            ub_k_1 = ub_k
 
-        ratio = float(stirling(n, k) / stirling(n, k + 1))
+        return profile
 
-        return ratio * self.num_partitions(n, m, k + 1)
+    def log_profiles(self, n, m):
+        # The ratios telescope: m S(n, k) / S(n, n-1)
+        profiles = _log_profile_ends(n, m)
+        log_stirling = log_stirling_table(n.max())[n]
+        rows = np.arange(len(n))
+        estimates = (np.log(m) - log_stirling[rows, n - 1])[:, np.newaxis] + log_stirling
+        inner = _inner_columns(n)
+        profiles[inner] = estimates[inner]
+        return profiles
 
 
 class StirlingDeltaEstimator(PartitionNumberEstimator):
@@ -146,19 +346,27 @@ class StirlingDeltaEstimator(PartitionNumberEstimator):
     def name(self):
         return 'stirling_delta_estimator'
 
-    def num_partitions(self, n, m, k=None):
-        if k is None:
-            return sum(self.num_partitions(n, m, i) for i in range(1, n + 1))
-
-        if k in (1, n):
-            return 1
+    def num_partitions_profile(self, n, m):
+        profile = _profile_ends(n, m)
 
-        if k == n - 1:
-            return m
+        ub_k_1 = stirling(n, n - 1)
+        for k in range(n - 2, 1, -1):
+            ub_k = stirling(n, k)
+            delta = int(ub_k - ub_k_1)
+            profile[k] = profile[k + 1] + delta
+            ub_k_1 = ub_k
 
-        delta = int(stirling(n, k) - stirling(n, k + 1))
+        return profile
 
-        return self.num_partitions(n, m, k + 1) + delta
+    def log_profiles(self, n, m):
+        # The deltas telescope: S(n, k) - (S(n, n-1) - m)
+        profiles = _log_profile_ends(n, m)
+        log_stirling = log_stirling_table(n.max())[n]
+        log_offset = np.log(n * (n - 1) / 2 - m)[:, np.newaxis]
+        estimates = log_stirling + np.log1p(-np.exp(log_offset - log_stirling))
+        inner = _inner_columns(n)
+        profiles[inner] = estimates[inner]
+        return profiles
 
 
 class LbUbRatioEstimator(PartitionNumberEstimator):
@@ -166,30 +374,53 @@ class LbUbRatioEstimator(PartitionNumberEstimator):
     def name(self):
         return 'lb_ub_ratio_estimator'
 
-    def num_partitions(self, n, m, k=None):
-        if k is None:
-            return sum(self.num_partitions(n, m, i) for i in range(n, 0, -1))
-
-        if k in (1, n):
-            return 1
-
-        if k == n - 1:
-            return m
-
-        # Recursively compute the estimate, start "from the end" (k=n, then k=n-1, ...)
-        ub_k_1 = stirling(n, k + 1)  # Previous upper bound
-        ub_k = stirling(n, k)  # Current upper bound
-        ub_ratio = float(ub_k / ub_k_1)  # Ratio -> factor that takes the previous to the current upper bound
-        lb_k_1 = binomial(n - 1, k)  # Previous lower bound
-        lb_k = binomial(n - 1, k - 1)  # Current lower bound
-        lb_ratio = float(lb_k / lb_k_1)  # Ratio -> factor that takes the previous to the current lower bound
-
-        est_k_1 = self.num_partitions(n, m, k + 1)  # Previous estimation
-        est_ratio = float((ub_k_1 - est_k_1) / (ub_k_1 - lb_k_1))  # Estimated linear ratio between lower/upper bound
-
-        est_k = est_k_1 * (est_ratio * lb_ratio + (1 - est_ratio) * ub_ratio)
-
-        return est_k
+    def total(self, profile):
+        return sum(reversed(profile[1:]))
+
+    def num_partitions_profile(self, n, m):
+        profile = _profile_ends(n, m)
+
+        # Compute the estimate "from the end" (k=n, then k=n-1, ...)
+        ub_k_1 = stirling(n, n - 1)  # Previous upper bound
+        lb_k_1 = binomial(n - 1, n - 2)  # Previous lower bound
+        for k in range(n - 2, 1, -1):
+            ub_k = stirling(n, k)  # Current upper bound
+            ub_ratio = float(ub_k / ub_k_1)  # Ratio -> factor that takes the previous to the current upper bound
+            lb_k = binomial(n - 1, k - 1)  # Current lower bound
+            lb_ratio = float(lb_k / lb_k_1)  # Ratio -> factor that takes the previous to the current lower bound
+
+            est_k_1 = profile[k + 1]  # Previous estimation
+            # Estimated linear ratio between lower/upper bound
+            est_ratio = float((ub_k_1 - est_k_1) / (ub_k_1 - lb_k_1))
+
+            profile[k] = est_k_1 * (est_ratio * lb_ratio + (1 - est_ratio) * ub_ratio)
+            ub_k_1 = ub_k
+            lb_k_1 = lb_k
+
+        return profile
+
+    def log_profiles(self, n, m):
+        profiles = _log_profile_ends(n, m)
+        k = np.arange(n.max() + 1)
+        log_ub = log_stirling_table(n.max())[n]
+        log_lb = log_binomial(n[:, np.newaxis] - 1, k - 1)
+        log_diff = log_ub + np.log1p(-np.exp(log_lb - log_ub))  # log(ub - lb)
+
+        # The ratio (ub_k_1 - est_k_1) / (ub_k_1 - lb_k_1) is carried along instead of being computed from the
+        # estimate, which loses all precision if the estimate is close to the upper bound (e.g. complete graphs):
+        # ub_k - est_k = (ub_k_1 - est_k_1) * (ub_ratio + est_k_1 / (ub_k_1 - lb_k_1) * (ub_ratio - lb_ratio))
+        est_ratio = (n * (n - 1) / 2 - m) / ((n - 1) * (n - 2) / 2)
+        for k in range(n.max() - 2, 1, -1):
+            active = k <= n - 2
+            ratio = est_ratio[active]
+            log_est_k_1 = profiles[active, k + 1]
+            lb_ratio = np.exp(log_lb[active, k] - log_lb[active, k + 1])
+            ub_ratio = np.exp(log_ub[active, k] - log_ub[active, k + 1])
+            profiles[active, k] = log_est_k_1 + np.log(ratio * lb_ratio + (1 - ratio) * ub_ratio)
+            est_ratio[active] = ratio * np.exp(log_diff[active, k + 1] - log_diff[active, k]) * (
+                ub_ratio + np.exp(log_est_k_1 - log_diff[active, k + 1]) * (ub_ratio - lb_ratio))
+
+        return profiles
 
 
 class LbUbDeltaEstimator(PartitionNumberEstimator):
@@ -197,27 +428,40 @@ class LbUbDeltaEstimator(PartitionNumberEstimator):
     def name(self):
         return 'lb_ub_delta_estimator'
 
-    def num_partitions(self, n, m, k=None):
-        if k is None:
-            return sum(self.num_partitions(n, m, i) for i in range(n, 0, -1))
-
-        if k in (1, n):
-            return 1
-
-        if k == n - 1:
-            return m
-
-        # Recursively compute the estimate, start "from the end" (k=n, then k=n-1, ...)
-        ub_k_1 = stirling(n, k + 1)  # Previous upper bound
-        ub_k = stirling(n, k)  # Current upper bound
-        ub_delta = int(ub_k - ub_k_1)
-        lb_k_1 = binomial(n - 1, k)  # Previous lower bound
-        lb_k = binomial(n - 1, k - 1)  # Current lower bound
-        lb_delta = int(lb_k - lb_k_1)
-
-        est_k_1 = self.num_partitions(n, m, k + 1)  # Previous estimation
-        est_ratio = float((ub_k_1 - est_k_1) / (ub_k_1 - lb_k_1))  # Estimated linear ratio between lower/upper bound
-
-        est_k = est_k_1 + (est_ratio * lb_delta + (1 - est_ratio) * ub_delta)
-
-        return est_k
+    def total(self, profile):
+        return sum(reversed(profile[1:]))
+
+    def num_partitions_profile(self, n, m):
+        profile = _profile_ends(n, m)
+
+        # Compute the estimate "from the end" (k=n, then k=n-1, ...)
+        ub_k_1 = stirling(n, n - 1)  # Previous upper bound
+        lb_k_1 = binomial(n - 1, n - 2)  # Previous lower bound
+        for k in range(n - 2, 1, -1):
+            ub_k = stirling(n, k)  # Current upper bound
+            ub_delta = int(ub_k - ub_k_1)
+            lb_k = binomial(n - 1, k - 1)  # Current lower bound
+            lb_delta = int(lb_k - lb_k_1)
+
+            est_k_1 = profile[k + 1]  # Previous estimation
+            # Estimated linear ratio between lower/upper bound
+            est_ratio = float((ub_k_1 - est_k_1) / (ub_k_1 - lb_k_1))
+
+            profile[k] = est_k_1 + (est_ratio * lb_delta + (1 - est_ratio) * ub_delta)
+            ub_k_1 = ub_k
+            lb_k_1 = lb_k
+
+        return profile
+
+    def log_profiles(self, n, m):
+        # The ratio between lower and upper bound stays the same for all k: est = r lb + (1 - r) ub
+        profiles = _log_profile_ends(n, m)
+        k = np.arange(n.max() + 1)
+        log_ub = log_stirling_table(n.max())[n]
+        log_lb = log_binomial(n[:, np.newaxis] - 1, k - 1)
+        ub = n * (n - 1) / 2  # S(n, n-1)
+        est_ratio = ((ub - m) / (ub - (n - 1)))[:, np.newaxis]
+        estimates = np.logaddexp(np.log(est_ratio) + log_lb, np.log1p(-est_ratio) + log_ub)
+        inner = _inner_columns(n)
+        profiles[inner] = estimates[inner]
+        return profiles
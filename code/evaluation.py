@@ -0,0 +1,168 @@
+"""
+This script evaluates the estimators on exact k-profiles without building any search space.
+
+The exact profiles are read from the per-graph output of ``searchspace.py --out`` (files ``*_searchspace.csv``)
+or are counted freshly for a file of input graphs. Every estimator is then evaluated on all graphs at once
+(see :meth:`estimation.PartitionNumberEstimator.log_profiles`). The errors per graph, per :math:`k` and per
+estimator are kept in a tidy table, which is aggregated per graph (SS, RMSE and AE as printed by
+``searchspace.py``) and per estimator.
+"""
+from __future__ import print_function, division, absolute_import, unicode_literals
+import argparse
+import glob
+import os.path
+
+import numpy as np
+import pandas as pd
+
+from counting import subset_dp_profile
+from searchspace import ESTIMATORS, read_graphs
+
+_SUFFIX = '_searchspace.csv'
+
+
+class ExactProfiles(object):
+    """
+    The exact k-profiles of connected graphs as one array with a row per graph (columns :math:`0, \\dots, \\max(n)`,
+    zero for :math:`k > n`)
+    """
+
+    def __init__(self, names, profiles):
+        self.names = list(names)
+        self.n = np.array([len(profile) - 1 for profile in profiles], dtype=int)
+        self.counts = np.zeros((len(profiles), self.n.max(initial=0) + 1))
+        for row, profile in enumerate(profiles):
+            self.counts[row, :len(profile)] = profile
+        # Each edge yields exactly one partition into n-1 clusters
+        self.m = np.where(self.n > 1, self.counts[np.arange(len(profiles)), np.maximum(self.n - 1, 0)], 0)
+
+    def __len__(self):
+        return len(self.names)
+
+    @staticmethod
+    def _is_connected(profile):
+        return len(profile) > 1 and profile[1] == 1
+
+    @classmethod
+    def from_searchspace_files(cls, folder):
+        """
+        Read all per-graph files ``<name>_searchspace.csv`` in *folder*; disconnected graphs are skipped
+        """
+        names = []
+        profiles = []
+        for path in sorted(glob.glob(os.path.join(folder, '*' + _SUFFIX))):
+            df = pd.read_csv(path)
+            if 'k' not in df.columns:  # The summary file graphs_searchspace.csv
+                continue
+
+            profile = [0] * (df['k'].max() + 1)
+            for k, num in zip(df['k'], df['num_k_partitions']):
+                profile[k] = num
+            if cls._is_connected(profile):
+                names.append(os.path.basename(path)[:-len(_SUFFIX)])
+                profiles.append(profile)
+
+        return cls(names, profiles)
+
+    @classmethod
+    def from_graphs(cls, graphs):
+        """
+        Count the profiles of the connected *graphs* by subset dynamic programming (see
+        :func:`counting.subset_dp_profile`)
+        """
+        names = []
+        profiles = []
+        for graph in graphs:
+            profile = subset_dp_profile(graph)
+            if cls._is_connected(profile):
+                names.append(graph.name)
+                profiles.append(profile)
+
+        return cls(names, profiles)
+
+
+def evaluate(exact, estimators=ESTIMATORS):
+    """
+    Evaluate all *estimators* on the graphs of *exact* (an :class:`ExactProfiles`).
+
+    :return: A tidy data frame with one row per graph, :math:`1 \\leq k \\leq n` and estimator
+    """
+    rows, k = np.nonzero((np.arange(exact.counts.shape[1]) >= 1) & (np.arange(exact.counts.shape[1]) <=
+                                                                    exact.n[:, np.newaxis]))
+    num_exact = exact.counts[rows, k]
+    names = np.array(exact.names, dtype=object)[rows]
+
+    frames = []
+    for estimator in estimators:
+        with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+            estimates = np.exp(estimator.log_profiles(exact.n, exact.m)[rows, k])
+        frames.append(pd.DataFrame({'graph': names,
+                                    'n': exact.n[rows],
+                                    'm': exact.m[rows].astype(int),
+                                    'k': k,
+                                    'estimator': estimator.name,
+                                    'num_k_partitions': num_exact,
+                                    'estimate': estimates,
+                                    'error': estimates - num_exact,
+                                    'relative_error': np.abs(estimates - num_exact) / num_exact}))
+
+    return pd.concat(frames, ignore_index=True)
+
+
+def aggregate_graphs(errors):
+    """
+    The errors of each estimator per graph: SS, RMSE and AE (mean relative error over all :math:`k`)
+    """
+    grouped = errors.assign(squared_error=errors['error'] ** 2).groupby(['estimator', 'graph', 'n', 'm'], sort=False)
+    df = grouped.agg(ss=('squared_error', 'sum'), ae=('relative_error', 'mean')).reset_index()
+    df['rmse'] = np.sqrt(df['ss'] / df['n'])
+    return df[['estimator', 'graph', 'n', 'm', 'ss', 'rmse', 'ae']]
+
+
+def aggregate_estimators(graph_errors):
+    """
+    The errors of each estimator over all graphs (*graph_errors* as returned by :func:`aggregate_graphs`).
+    The column *mean_ae* is the error printed by ``searchspace.py``.
+    """
+    return graph_errors.groupby('estimator', sort=False).agg(num_graphs=('graph', 'size'),
+                                                             mean_ae=('ae', 'mean'),
+                                                             median_ae=('ae', 'median'),
+                                                             max_ae=('ae', 'max'),
+                                                             mean_rmse=('rmse', 'mean')).reset_index()
+
+
+def main():
+    argparser = argparse.ArgumentParser(description='Evaluate the estimators on known exact numbers of partitions.')
+    argparser.add_argument('path', type=str,
+                           help='Path to a folder with the per-graph output of searchspace.py --out or, with '
+                                '--count, to a csv file of graphs in Graph6 format (rows: name,graph6)')
+    argparser.add_argument('--count', nargs='?', const=True, default=False,
+                           help='Count the exact numbers of partitions of the graphs in the input file first')
+    argparser.add_argument('--out', type=str, default=None,
+                           help='Path to a output folder (must exist) for the files estimator_errors.csv, '
+                                'estimator_errors_graphs.csv and estimator_errors_summary.csv')
+    args = argparser.parse_args()
+
+    if args.count:
+        exact = ExactProfiles.from_graphs(read_graphs(args.path))
+    else:
+        exact = ExactProfiles.from_searchspace_files(args.path)
+
+    if not len(exact):
+        argparser.error('No connected graphs found')
+
+    errors = evaluate(exact)
+    graph_errors = aggregate_graphs(errors)
+    summary = aggregate_estimators(graph_errors)
+
+    for row in summary.itertuples():
+        print('Error of "{}": {:.3f}'.format(row.estimator, row.mean_ae))
+
+    if args.out:
+        errors.to_csv(os.path.join(args.out, 'estimator_errors.csv'), index=False)
+        graph_errors.to_csv(os.path.join(args.out, 'estimator_errors_graphs.csv'), index=False)
+        summary.to_csv(os.path.join(args.out, 'estimator_errors_summary.csv'), index=False)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+"""
+This script generates all non-isomorphic connected graphs on :math:`n` nodes and counts their partitions.
+
+The graphs are generated by canonical augmentation (McKay's method): A graph on :math:`k+1` nodes is created
+from a connected graph on :math:`k` nodes by adding a node that is adjacent to a non-empty set of the existing
+nodes. The child is accepted only if the new node is equivalent (in the same automorphism orbit) to the
+canonically chosen node, i.e. the last node in canonical order among the nodes of maximum degree whose removal
+keeps the graph connected. Hence, each graph has a unique parent and is generated exactly once; isomorphic
+children of the same parent are removed by their certificates. Nothing but the current path of the search is
+kept in memory, so the graphs are passed on to the counting while they are generated.
+"""
+from __future__ import print_function, division, absolute_import, unicode_literals
+import argparse
+
+import pandas as pd
+
+from bitgraph import BitGraph, popcount
+from canonical import canonical_form, canonical_labelling
+from datastructures import SearchSpace
+from searchspace import BACKENDS
+
+
+def _is_cut_node(bitgraph, node):
+    return not bitgraph.is_connected(bitgraph.all_nodes & ~(1 << node))
+
+
+def _accepted_certificate(adjacency):
+    """
+    Check whether the graph *adjacency* is accepted as child of the graph without its last node (see the module
+    documentation).
+
+    :return: The certificate of the graph if it is accepted, None otherwise
+    """
+    bitgraph = BitGraph(range(len(adjacency)), adjacency)
+    new = len(adjacency) - 1  # Never a cut node, because its parent is connected
+    degrees = [popcount(neighbours) for neighbours in adjacency]
+
+    # Cheap rejection: A node of larger degree that is no cut node is preferred
+    if any(degrees[node] > degrees[new] and not _is_cut_node(bitgraph, node) for node in range(new)):
+        return None
+
+    certificate, ordering = canonical_labelling(len(adjacency), [adjacency])
+    ties = [node for node in range(new) if degrees[node] == degrees[new] and not _is_cut_node(bitgraph, node)]
+    if ties:
+        position = {node: pos for pos, node in enumerate(ordering)}
+        chosen = max(ties + [new], key=position.get)
+        if chosen != new:
+            colours = [0] * len(adjacency)
+            colours[new] = 1
+            new_form = canonical_form(len(adjacency), [adjacency], colours)
+            colours[new] = 0
+            colours[chosen] = 1
+            if canonical_form(len(adjacency), [adjacency], colours) != new_form:
+                return None
+
+    return certificate
+
+
+def connected_graphs(n, min_edges=None, max_edges=None):
+    """
+    Generate all non-isomorphic connected graphs on *n* nodes with :math:`min\\_edges \\leq m \\leq max\\_edges`
+    (default: all) as :class:`bitgraph.BitGraph` instances named by their graph6 string.
+    """
+    if n < 1:
+        return
+
+    if min_edges is None:
+        min_edges = n - 1
+    if max_edges is None:
+        max_edges = n * (n - 1) // 2
+
+    def extend(adjacency, m):
+        k = len(adjacency)
+        if k == n:
+            if min_edges <= m <= max_edges:
+                graph = BitGraph(range(n), adjacency)
+                graph.name = graph.to_graph6()
+                yield graph
+            return
+
+        # Each further node adds at least one edge and at most one edge per existing node
+        if m + n - k > max_edges or m + (k + n - 1) * (n - k) // 2 < min_edges:
+            return
+
+        certificates = set()
+        for neighbours in range(1, 1 << k):
+            child = tuple(adjacency[node] | (1 << k) if neighbours >> node & 1 else adjacency[node]
+                          for node in range(k)) + (neighbours,)
+            certificate = _accepted_certificate(child)
+            if certificate is not None and certificate not in certificates:
+                certificates.add(certificate)
+                for graph in extend(child, m + popcount(neighbours)):
+                    yield graph
+
+    for graph in extend((0,), 0):
+        yield graph
+
+
+def main():
+    argparser = argparse.ArgumentParser(description='Generate all connected graphs on n nodes and count their '
+                                                    'partitions.')
+    argparser.add_argument('n', type=int, help='Number of nodes')
+    argparser.add_argument('--min_edges', type=int, default=None, help='Minimum number of edges')
+    argparser.add_argument('--max_edges', type=int, default=None, help='Maximum number of edges')
+    argparser.add_argument('--backend', type=str, choices=sorted(BACKENDS), default='subset_dp',
+                           help='How to determine the number of partitions (see searchspace.py)')
+    argparser.add_argument('--graphs', type=str, default=None,
+                           help='Path to a graph6 file for the generated graphs (e.g. as input of searchspace.py)')
+    argparser.add_argument('--out', type=str, default=None,
+                           help='Path to a csv file for the numbers of partitions of all graphs (same columns as '
+                                'searchspace_sizes_all_graphs.csv)')
+    args = argparser.parse_args()
+
+    graph_file = open(args.graphs, 'w') if args.graphs else None
+    records = []
+    for graph in connected_graphs(args.n, args.min_edges, args.max_edges):
+        if graph_file is not None:
+            graph_file.write(graph.name + '\n')
+
+        sp = SearchSpace(graph, counter=BACKENDS[args.backend])
+        sp.build()
+        records.append(sp.to_record())
+
+    if graph_file is not None:
+        graph_file.close()
+
+    df = pd.DataFrame.from_records(records, columns=['m', 'n', 'name', 'num_partitions', 'num_partitions_lb',
+                                                     'num_partitions_ub'])
+    print('{} connected graphs on {} nodes'.format(len(df), args.n))
+    if len(df):
+        summary = df.groupby('m')['num_partitions'].agg(['count', 'min', 'median', 'max'])
+        print(summary.to_string())
+
+    if args.out:
+        df.to_csv(args.out, index=False)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,187 @@
+"""
+A disk-backed store for the partitions of a search space level that does not need to fit into memory.
+
+A partition (sorted tuple of cluster masks, see :class:`datastructures.SearchSpaceNode`) is encoded as a
+fixed-width record of :math:`n` bytes: the :math:`i`-th byte is the index of the cluster of node :math:`i`.
+Partitions are collected in memory up to a budget; then the buffer is sorted and written to a temporary run
+file. When the level is read, all runs are merged (external merge sort) and duplicates are dropped on the fly.
+A run file is only open while it is written or merged, and at most :data:`MERGE_FAN_IN` runs are merged at once
+(in several passes if necessary), so the number of runs is not limited by the number of open files.
+"""
+from __future__ import print_function, division, absolute_import, unicode_literals
+import heapq
+import os
+import tempfile
+
+from bitgraph import iter_bits
+
+# Rough number of bytes a partition of a graph with n nodes occupies in memory: a tuple of cluster masks and
+# its set slot (constant part), plus about one mask per node
+PARTITION_BYTES_CONSTANT = 120
+PARTITION_BYTES_PER_NODE = 40
+
+# Number of records that are read from a run file at once
+READ_BUFFER_RECORDS = 4096
+
+# Maximum number of runs that are merged at once, i.e. open at the same time
+MERGE_FAN_IN = 64
+
+
+def encode(blocks, num_nodes):
+    """
+    Encode the sorted tuple of cluster masks *blocks* as a record of *num_nodes* bytes
+    """
+    record = bytearray(num_nodes)
+    for cluster, mask in enumerate(blocks):
+        for node in iter_bits(mask):
+            record[node] = cluster
+    return bytes(record)
+
+
+def decode(record):
+    """
+    Decode a record into the sorted tuple of cluster masks (the cluster indices follow the sort order)
+    """
+    blocks = [0] * (max(record) + 1)
+    for node, cluster in enumerate(bytearray(record)):
+        blocks[cluster] |= 1 << node
+    return tuple(blocks)
+
+
+def partitions_per_run(num_nodes, memory_budget):
+    """
+    The number of partitions that are buffered in memory before a run is written, such that the buffer
+    roughly needs *memory_budget* bytes
+    """
+    return max(1, memory_budget // (PARTITION_BYTES_CONSTANT + PARTITION_BYTES_PER_NODE * num_nodes))
+
+
+def write_partitions(path, partitions, num_nodes):
+    """
+    Write the partitions (sorted tuples of cluster masks) of a graph with *num_nodes* nodes as records into a new
+    file, e.g. to hand them to another process
+    """
+    with open(path, 'wb') as f:
+        f.write(b''.join(encode(blocks, num_nodes) for blocks in partitions))
+
+
+def read_partitions(path, num_nodes):
+    """
+    Iterate over the partitions of a file of :func:`write_partitions`
+    """
+    for record in _read_records(path, num_nodes):
+        yield decode(record)
+
+
+def _read_records(path, width):
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(width * READ_BUFFER_RECORDS)
+            if not chunk:
+                return
+            for offset in range(0, len(chunk), width):
+                yield chunk[offset:offset + width]
+
+
+class ExternalLevelStore(object):
+    """
+    A set-like container for :class:`datastructures.SearchSpaceNode` objects of a single level.
+    Nodes can be added until the store is read (iteration or :func:`len`); then it is frozen. All files are
+    temporary and vanish with the store.
+    """
+
+    def __init__(self, bitgraph, memory_budget, directory=None):
+        """
+        :param bitgraph: The graph whose partitions are stored
+        :param memory_budget: The approximate number of bytes that the in-memory buffer may occupy
+        :param directory: The directory of the temporary files (default: the system default)
+        """
+        if bitgraph.order() > 256:
+            raise ValueError('Records are limited to 256 clusters')
+
+        self._bitgraph = bitgraph
+        self._width = bitgraph.order()
+        self._max_buffered = partitions_per_run(self._width, memory_budget)
+        self._directory = directory
+        self._buffer = set()
+        self._tmp_dir = None  # Created with the first run
+        self._num_files = 0
+        self._runs = []  # Paths of the run files
+        self._merged = None
+        self._size = None
+
+    def add(self, node):
+        if self._size is not None:
+            raise ValueError('The store was already read')
+
+        self._buffer.add(node.blocks)
+        if len(self._buffer) >= self._max_buffered:
+            self._write_run()
+
+    def _new_path(self):
+        if self._tmp_dir is None:
+            self._tmp_dir = tempfile.TemporaryDirectory(dir=self._directory)  # Deleted with the store
+        self._num_files += 1
+        return os.path.join(self._tmp_dir.name, 'run{}'.format(self._num_files))
+
+    def _write_run(self):
+        path = self._new_path()
+        with open(path, 'wb') as f:
+            f.write(b''.join(sorted(encode(blocks, self._width) for blocks in self._buffer)))
+        self._runs.append(path)
+        self._buffer = set()
+
+    def _merge_runs(self, runs):
+        """
+        Merge the sorted run files *runs* into a new run without duplicates and delete them
+
+        :return: A tuple *(path of the new run, number of records)*
+        """
+        path = self._new_path()
+        size = 0
+        previous = None
+        with open(path, 'wb') as f:
+            for record in heapq.merge(*[_read_records(run, self._width) for run in runs]):
+                if record != previous:
+                    f.write(record)
+                    size += 1
+                    previous = record
+        for run in runs:
+            os.remove(run)
+        return path, size
+
+    def _finish(self):
+        """
+        Merge all runs into a single deduplicated file (if anything was spilled to disk)
+        """
+        if self._size is not None:
+            return
+
+        if not self._runs:  # Everything fits into the buffer
+            self._size = len(self._buffer)
+            return
+
+        if self._buffer:
+            self._write_run()
+
+        runs = self._runs
+        while len(runs) > MERGE_FAN_IN:  # Intermediate passes
+            runs = [self._merge_runs(runs[idx:idx + MERGE_FAN_IN])[0] for idx in range(0, len(runs), MERGE_FAN_IN)]
+
+        self._runs = []
+        self._merged, self._size = self._merge_runs(runs)
+
+    def __len__(self):
+        self._finish()
+        return self._size
+
+    def __iter__(self):
+        from datastructures import SearchSpaceNode  # Avoid circular import
+
+        self._finish()
+        if self._merged is None:
+            for blocks in self._buffer:
+                yield SearchSpaceNode(self._bitgraph, blocks)
+        else:
+            for record in _read_records(self._merged, self._width):
+                yield SearchSpaceNode(self._bitgraph, decode(record))
@@ -0,0 +1,212 @@
+"""
+A Monte Carlo estimator of the number of connected partitions of graphs that are too large for enumeration.
+
+The agglomerative search space (see :meth:`datastructures.SearchSpaceNode.expand`) reaches a partition by many
+different sequences of merges. Fixing the order of the merges removes these duplicates: The edges are processed
+in a fixed order, and each edge between two different clusters is either contracted (the clusters are merged) or
+cut (the clusters must never be merged). An edge inside a cluster is contracted implicitly, and an edge between
+clusters that are separated by a cut edge must be cut as well. Every sequence of free decisions yields a
+different connected partition and every connected partition is reached by exactly one sequence, i.e. the
+decisions form a tree without dead ends whose leaves are the partitions.
+
+Knuth's estimator follows a random path through this tree, i.e. each free decision is made by a fair coin flip.
+The estimate :math:`2^f` of a path with :math:`f` free decisions is an unbiased estimate of the number of
+partitions, and :math:`2^f` counted only for paths that end with :math:`k` clusters is an unbiased estimate of the
+number of :math:`k`-partitions. The mean over many independent probes converges to the exact numbers and the
+sample variance yields (normal approximation) confidence intervals. For trees, every path has :math:`n-1` free
+decisions, so the estimate is exact; the denser a graph, the larger the variance. All sums are exact integers,
+so even astronomically large counts do not overflow.
+"""
+from __future__ import print_function, division, absolute_import, unicode_literals
+import argparse
+import math
+from multiprocessing import Pool
+import random
+from statistics import NormalDist
+import time
+
+from bitgraph import BitGraph, iter_bits
+from searchspace import iter_graphs
+
+
+def probe(bitgraph, edges, rng):
+    """
+    Follow a single random path through the decision tree of *bitgraph* (see the module documentation).
+
+    :param edges: The edges of *bitgraph* as pairs of node indices in the order of the decisions
+    :return: A tuple *(number of clusters, estimate)*
+    """
+    n = bitgraph.order()
+    cluster_of = list(range(n))  # Index of the representative node
+    members = [1 << node for node in range(n)]  # Per representative node
+    separated = [0] * n  # Per representative node: The nodes behind cut edges
+    num_clusters = n
+    free = 0
+
+    for u, v in edges:
+        a = cluster_of[u]
+        b = cluster_of[v]
+        if a == b or separated[a] & members[b]:  # Contracted or cut implicitly
+            continue
+
+        free += 1
+        if rng.random() < 0.5:
+            separated[a] |= 1 << v
+            separated[b] |= 1 << u
+        else:
+            merged = members[b]
+            members[a] |= merged
+            separated[a] |= separated[b]
+            for node in iter_bits(merged):
+                cluster_of[node] = a
+            num_clusters -= 1
+
+    return num_clusters, 1 << free
+
+
+class MonteCarloEstimate(object):
+    """
+    The accumulated probes of a graph with *num_nodes* nodes: The sums of the estimates and of their squares per
+    number of clusters :math:`k` and of all estimates
+    """
+
+    def __init__(self, num_nodes):
+        self.num_nodes = num_nodes
+        self.num_samples = 0
+        self.sums = [0] * (num_nodes + 1)
+        self.square_sums = [0] * (num_nodes + 1)
+
+    def add(self, num_clusters, estimate):
+        self.num_samples += 1
+        self.sums[num_clusters] += estimate
+        self.square_sums[num_clusters] += estimate * estimate
+
+    def update(self, other):
+        """
+        Add the probes of another estimate of the same graph
+        """
+        self.num_samples += other.num_samples
+        for k in range(self.num_nodes + 1):
+            self.sums[k] += other.sums[k]
+            self.square_sums[k] += other.square_sums[k]
+
+    def _sums(self, k):
+        if k is None:  # Each probe contributes to a single k
+            return sum(self.sums), sum(self.square_sums)
+        if not 0 <= k <= self.num_nodes:
+            return 0, 0
+        return self.sums[k], self.square_sums[k]
+
+    def log10_num_partitions(self, k=None):
+        """
+        The :math:`\\log_{10}` of the estimated number of partitions into *k* clusters (all partitions if *k* is
+        None); :math:`-\\infty` if no probe ended with *k* clusters
+        """
+        total, _ = self._sums(k)
+        if not total:
+            return -math.inf
+        return math.log10(total) - math.log10(self.num_samples)
+
+    def relative_standard_error(self, k=None):
+        """
+        The standard error of the estimate relative to the estimate (NaN if unknown)
+        """
+        total, square_total = self._sums(k)
+        if not total or self.num_samples < 2:
+            return math.nan
+        numerator = self.num_samples * square_total - total * total  # (N - 1) N times the sample variance
+        if not numerator:
+            return 0.
+        return 10 ** (0.5 * (math.log10(numerator) - math.log10(self.num_samples - 1)) - math.log10(total))
+
+    def log10_confidence_interval(self, k=None, confidence=0.95):
+        """
+        The :math:`\\log_{10}` of the bounds of the confidence interval of the estimate (normal approximation);
+        the lower bound is :math:`-\\infty` if the interval contains 0
+        """
+        estimate = self.log10_num_partitions(k)
+        half_width = NormalDist().inv_cdf((1 + confidence) / 2) * self.relative_standard_error(k)
+        if math.isnan(half_width):
+            return math.nan, math.nan
+        lower = estimate + math.log10(1 - half_width) if half_width < 1 else -math.inf
+        return lower, estimate + math.log10(1 + half_width)
+
+
+def _sample(bitgraph, num_samples, seconds, seed):
+    """
+    Accumulate *num_samples* probes (None: unlimited) or as many as possible in *seconds* (None: unlimited)
+    """
+    rng = random.Random(seed)
+    edges = list(bitgraph.index_edges())
+    result = MonteCarloEstimate(bitgraph.order())
+    deadline = time.monotonic() + seconds if seconds is not None else None
+    while num_samples is None or result.num_samples < num_samples:
+        if deadline is not None and time.monotonic() >= deadline:
+            break
+        result.add(*probe(bitgraph, edges, rng))
+    return result
+
+
+def estimate(graph, samples=None, seconds=None, jobs=1, seed=None):
+    """
+    Estimate the numbers of partitions of *graph* with a budget of *samples* probes and/or *seconds* of wall time.
+    If *jobs* is larger than 1, the probes are distributed over this number of worker processes.
+
+    :param graph: A NetworkX graph or a :class:`bitgraph.BitGraph`
+    :return: A :class:`MonteCarloEstimate`
+    """
+    if samples is None and seconds is None:
+        raise ValueError('Either samples or seconds needed')
+
+    bitgraph = BitGraph.from_graph(graph)
+    if seed is None:
+        seed = random.randrange(2 ** 32)
+
+    if jobs < 2:
+        return _sample(bitgraph, samples, seconds, seed)
+
+    shares = [None] * jobs if samples is None else [samples // jobs + (idx < samples % jobs) for idx in range(jobs)]
+    pool = Pool(jobs)
+    parts = pool.starmap(_sample, [(bitgraph, share, seconds, seed + idx) for idx, share in enumerate(shares)])
+    pool.close()
+    pool.join()
+
+    result = MonteCarloEstimate(bitgraph.order())
+    for part in parts:
+        result.update(part)
+    return result
+
+
+def main():
+    argparser = argparse.ArgumentParser(description='Estimate the number of partitions of each graph in the input '
+                                                    'file by random probing of the search space.')
+    argparser.add_argument('path', type=str,
+                           help='Path to a csv file of graphs in Graph6 format (rows: name,graph6) or to a graph6 file')
+    argparser.add_argument('--names', type=str, nargs='*', default=None, help='Only estimate these graphs')
+    argparser.add_argument('--samples', type=int, default=None, help='Number of probes per graph')
+    argparser.add_argument('--seconds', type=float, default=None, help='Wall time per graph')
+    argparser.add_argument('--jobs', type=int, default=1, help='Number of worker processes')
+    argparser.add_argument('--confidence', type=float, default=0.95, help='Confidence level of the intervals')
+    argparser.add_argument('--seed', type=int, default=None, help='Seed of the random number generator')
+    args = argparser.parse_args()
+
+    if args.samples is None and args.seconds is None:
+        argparser.error('At least one of --samples and --seconds is needed')
+
+    for graph in iter_graphs(args.path):
+        if args.names is not None and graph.name not in args.names:
+            continue
+
+        result = estimate(graph, args.samples, args.seconds, args.jobs, args.seed)
+        print('Graph: {} (n={}, m={}, samples={})'.format(graph.name, graph.number_of_nodes(),
+                                                          graph.number_of_edges(), result.num_samples))
+        for k in [None] + list(range(graph.number_of_nodes(), 0, -1)):
+            lower, upper = result.log10_confidence_interval(k, args.confidence)
+            print('{}\tlog10 #Partitions={:.4f}\t[{:.4f}, {:.4f}]\trel. std. error={:.4f}'.format(
+                'total' if k is None else 'k={}'.format(k), result.log10_num_partitions(k), lower, upper,
+                result.relative_standard_error(k)))
+        print()
+
+
+if __name__ == '__main__':
+    main()
@@ -3,7 +3,8 @@ import argparse
 import matplotlib
 from matplotlib import pyplot as plt
 import pandas as pd
-from sympy.functions.combinatorial.numbers import stirling, binomial
+
+from combinatorics import stirling, binomial
 
 plt.style.use(['ggplot'])  # ggplot-like style
 
@@ -0,0 +1,86 @@
+"""
+A persistent SQLite store of search space sizes, so that repeated or interrupted runs only compute missing graphs.
+
+Graphs are identified by their canonical graph6 string (see :func:`canonical_graph6`), hence isomorphic graphs
+with different names share a single entry. Each entry holds the k-profile of the graph (see
+:meth:`datastructures.SearchSpace.profile`) and the total number of partitions. Numbers are stored as text
+because they may exceed the integer range of SQLite.
+"""
+from __future__ import print_function, division, absolute_import, unicode_literals
+import json
+import sqlite3
+
+from networkx import Graph
+from networkx.readwrite.graph6 import to_graph6_bytes
+
+from bitgraph import BitGraph
+from canonical import canonical_labelling
+
+
+def canonical_graph6(graph):
+    """
+    The graph6 string (without header) of *graph* relabelled by its canonical labelling
+
+    :param graph: A NetworkX graph or a :class:`BitGraph`
+    """
+    bitgraph = BitGraph.from_graph(graph)
+    n = bitgraph.order()
+    _, ordering = canonical_labelling(n, [bitgraph.adjacency])
+    position = {node: pos for pos, node in enumerate(ordering)}
+
+    canonical = Graph()
+    canonical.add_nodes_from(range(n))
+    canonical.add_edges_from((position[i], position[j]) for i, j in bitgraph.index_edges())
+    return to_graph6_bytes(canonical, header=False).decode('ascii').strip()
+
+
+class ResultStore(object):
+    """
+    The k-profiles of graphs in a SQLite database at *path* (created if it does not exist).
+    Every :meth:`add` is committed immediately, so nothing is lost if a run is interrupted.
+    """
+
+    def __init__(self, path):
+        self._connection = sqlite3.connect(path)
+        self._connection.execute('CREATE TABLE IF NOT EXISTS searchspace ('
+                                 'graph6 TEXT PRIMARY KEY, '
+                                 'name TEXT, '
+                                 'n INTEGER, '
+                                 'm INTEGER, '
+                                 'num_partitions TEXT, '
+                                 'profile TEXT)')
+        self._connection.commit()
+
+    @staticmethod
+    def key(graph):
+        """
+        The key of *graph* in the store, see :func:`canonical_graph6`. It can be passed to :meth:`profile` and
+        :meth:`add`, so the canonical form is computed only once.
+        """
+        return canonical_graph6(graph)
+
+    def profile(self, graph, key=None):
+        """
+        Get the stored k-profile of *graph* (or an isomorphic graph) or None if it is unknown
+        """
+        row = self._connection.execute('SELECT profile FROM searchspace WHERE graph6 = ?',
+                                       (key or self.key(graph),)).fetchone()
+        if row is None:
+            return None
+        return [int(num) for num in json.loads(row[0])]
+
+    def add(self, graph, profile, key=None):
+        """
+        Store the k-profile of *graph*. An existing entry of an isomorphic graph is kept.
+        """
+        self._connection.execute('INSERT OR IGNORE INTO searchspace VALUES (?, ?, ?, ?, ?, ?)',
+                                 (key or self.key(graph), graph.name, graph.number_of_nodes(),
+                                  graph.number_of_edges(), str(sum(profile)),
+                                  json.dumps([str(num) for num in profile])))
+        self._connection.commit()
+
+    def __len__(self):
+        return self._connection.execute('SELECT COUNT(*) FROM searchspace').fetchone()[0]
+
+    def close(self):
+        self._connection.close()
@@ -0,0 +1,328 @@
+"""
+This script draws connected partitions of graphs uniformly at random, e.g. as random baselines for clustering
+algorithms.
+
+Exact sampling (:class:`UniformSampler`) follows the depth-first search of :func:`datastructures.iter_partitions`
+and chooses the cluster of the lowest remaining node with a probability proportional to the number of partitions
+of the other nodes, which is the same as unranking a uniformly random index (see
+:class:`datastructures.PartitionRanking`). The weights of all visited choices are cached, so after the first few
+samples each step of a sample is a binary search. The counts need the subset dynamic programming of
+:mod:`counting`, which is only feasible for graphs of moderate size. Its cost depends on the number of nodes and on
+the density of the graph, so method 'auto' builds the counting table with a bounded number of enumerated clusters
+(:data:`AUTO_MAX_SUBSETS`) and falls back to the Markov chain if the bound is exceeded.
+
+Larger graphs are sampled by a Markov chain (:class:`MarkovChainSampler`) whose stationary distribution is the
+uniform distribution over all connected partitions. Each step picks an ordered pair :math:`(v, u)` of adjacent
+nodes uniformly at random. If :math:`u` is in another cluster, :math:`v` is moved into the cluster of :math:`u`;
+otherwise :math:`v` is split off as a new cluster. Moves that disconnect a cluster are rejected, the others are
+accepted with the Metropolis-Hastings probability :math:`\\min(1, r / f)`, where :math:`f` and :math:`r` are the
+numbers of pairs that propose the move and its reverse. Splitting off single nodes reaches the partition into
+single nodes from any partition, so the chain is irreducible and converges to the uniform distribution; its samples
+are approximately uniform only and consecutive samples are correlated. Samples with a fixed number of clusters
+:math:`k` are obtained by rejecting all other states of the chain.
+"""
+from __future__ import print_function, division, absolute_import, unicode_literals
+import argparse
+from bisect import bisect_right
+import csv
+from multiprocessing import Pool
+import random
+import time
+
+from bitgraph import BitGraph, popcount
+from counting import subset_profile_table
+from datastructures import PartitionRanking, SearchSpaceNode
+from searchspace import iter_graphs
+
+# Method 'auto' samples exactly if the counting table needs at most this many clusters (a few seconds)
+AUTO_MAX_SUBSETS = 10 ** 6
+
+METHODS = ['auto', 'exact', 'mcmc']
+
+
+class UniformSampler(PartitionRanking):
+    """
+    Draw connected partitions of a graph exactly uniformly at random (see the module documentation)
+    """
+
+    def __init__(self, graph, seed=None, table=None):
+        """
+        :param graph: A NetworkX graph or a :class:`bitgraph.BitGraph`
+        :param seed: The seed of the random number generator
+        :param table: The counting table of *graph* (see :func:`counting.subset_profile_table`)
+        """
+        super(UniformSampler, self).__init__(graph, table)
+        self._rng = random.Random(seed)
+        self._tables = {}  # (remaining nodes, number of clusters) -> (clusters, cumulative numbers of partitions)
+        n = self.bitgraph.order()
+        self._k_table = list(range(n + 1)), _cumulative(self.num_partitions(k) for k in range(n + 1))
+
+    def _table(self, remaining, num_clusters):
+        key = (remaining, num_clusters)
+        table = self._tables.get(key)
+        if table is None:
+            choices = list(self._choices(remaining, num_clusters))
+            table = self._tables[key] = [cluster for cluster, _ in choices], _cumulative(num for _, num in choices)
+        return table
+
+    def _choose(self, table):
+        values, cumulative = table
+        if len(values) == 1:  # E.g. the last cluster
+            return values[0]
+        return values[bisect_right(cumulative, self._rng.randrange(cumulative[-1]))]
+
+    def sample(self, k=None):
+        """
+        A uniformly random connected partition into *k* clusters (any number of clusters if *k* is None)
+
+        :return: A :class:`datastructures.SearchSpaceNode`
+        """
+        if k is None:
+            if not self._k_table[1][-1]:
+                raise ValueError('The graph has no partitions')
+            k = self._choose(self._k_table)
+        elif not self.num_partitions(k):
+            raise ValueError('The graph has no partitions into {} connected clusters'.format(k))
+
+        remaining = self.bitgraph.all_nodes
+        blocks = []
+        while remaining:
+            cluster = self._choose(self._table(remaining, k - len(blocks)))
+            blocks.append(cluster)
+            remaining &= ~cluster
+
+        return SearchSpaceNode(self.bitgraph, tuple(sorted(blocks)))
+
+
+def _cumulative(numbers):
+    total = 0
+    result = []
+    for num in numbers:
+        total += num
+        result.append(total)
+    return result
+
+
+class MarkovChainSampler(object):
+    """
+    Draw connected partitions of a graph approximately uniformly at random by a Markov chain (see the module
+    documentation). The chain starts at the partition into single nodes.
+    """
+
+    def __init__(self, graph, seed=None, burn_in=None, steps=None):
+        """
+        :param graph: A NetworkX graph or a :class:`bitgraph.BitGraph` with at least one edge
+        :param seed: The seed of the random number generator
+        :param burn_in: The number of steps before the first sample (default: 100 times the number of edges)
+        :param steps: The number of steps between two samples (default: 10 times the number of edges)
+        """
+        self._bitgraph = BitGraph.from_graph(graph)
+        self._pairs = [pair for i, j in self._bitgraph.index_edges() for pair in ((i, j), (j, i))]
+        if not self._pairs:
+            raise ValueError('The graph has no edges')
+
+        self._rng = random.Random(seed)
+        m = len(self._pairs) // 2
+        self._burn_in = 100 * m if burn_in is None else burn_in
+        self._steps = 10 * m if steps is None else steps
+        n = self._bitgraph.order()
+        self._cluster_of = list(range(n))  # Cluster label of each node
+        self._members = {node: 1 << node for node in range(n)}  # Cluster label -> node mask
+        self._next_label = n
+        self._started = False
+
+    @property
+    def bitgraph(self):
+        return self._bitgraph
+
+    def step(self):
+        """
+        Perform a single step of the chain
+
+        :return: True if the partition changed
+        """
+        v, u = self._pairs[self._rng.randrange(len(self._pairs))]
+        bitgraph = self._bitgraph
+        source = self._cluster_of[v]
+        target = self._cluster_of[u]
+        rest = self._members[source] & ~(1 << v)
+
+        if rest and not bitgraph.is_connected(rest):
+            return False
+
+        if source == target:  # Split off v; the reverse merge is proposed by as many pairs
+            label = self._next_label
+            self._next_label += 1
+            self._members[source] = rest
+            self._members[label] = 1 << v
+            self._cluster_of[v] = label
+            return True
+
+        neighbours = bitgraph.adjacency[v]
+        forward = popcount(neighbours & self._members[target])
+        reverse = popcount(neighbours & rest) if rest else forward  # A merge is reversed by a split
+        if reverse < forward and self._rng.random() * forward >= reverse:
+            return False
+
+        if rest:
+            self._members[source] = rest
+        else:
+            del self._members[source]
+        self._members[target] |= 1 << v
+        self._cluster_of[v] = target
+        return True
+
+    @property
+    def blocks(self):
+        """
+        The current partition as sorted tuple of cluster masks
+        """
+        return tuple(sorted(self._members.values()))
+
+    def sample(self, k=None):
+        """
+        An approximately uniformly random connected partition into *k* clusters (any number of clusters if *k* is
+        None). The chain is sampled every :math:`steps` steps until the partition has *k* clusters, so rare values of
+        *k* need many steps.
+
+        :return: A :class:`datastructures.SearchSpaceNode`
+        """
+        if k is not None and not len(self._bitgraph.components()) <= k <= self._bitgraph.order():
+            raise ValueError('The graph has no partitions into {} connected clusters'.format(k))
+
+        if not self._started:
+            for _ in range(self._burn_in):
+                self.step()
+            self._started = True
+
+        while True:
+            for _ in range(self._steps):
+                self.step()
+            if k is None or len(self._members) == k:
+                return SearchSpaceNode(self._bitgraph, self.blocks)
+
+
+def counting_table(graph, method='auto'):
+    """
+    The counting table for exact sampling of *graph* by *method*: Always computed for method 'exact', None for
+    method 'mcmc', and None for method 'auto' if it needs more than :data:`AUTO_MAX_SUBSETS` clusters
+    """
+    if method not in METHODS:
+        raise ValueError('Unknown method: {}'.format(method))
+    if method == 'mcmc':
+        return None
+    return subset_profile_table(BitGraph.from_graph(graph), AUTO_MAX_SUBSETS if method == 'auto' else None)
+
+
+def create_sampler(graph, method='auto', seed=None, burn_in=None, steps=None, table=None):
+    """
+    Create a :class:`UniformSampler` (method 'exact', or 'auto' if the counting table is cheap, see
+    :func:`counting_table`) or a :class:`MarkovChainSampler` (method 'mcmc', or 'auto' for expensive tables).
+    A given counting *table* of *graph* is used for exact sampling by methods 'exact' and 'auto'.
+    """
+    if method not in METHODS:
+        raise ValueError('Unknown method: {}'.format(method))
+
+    bitgraph = BitGraph.from_graph(graph)
+    if table is None:
+        table = counting_table(bitgraph, method)
+    if table is not None and method != 'mcmc':
+        return UniformSampler(bitgraph, seed, table)
+    return MarkovChainSampler(bitgraph, seed, burn_in, steps)
+
+
+def _sample_blocks(bitgraph, num_samples, k, method, seed, burn_in, steps, table):
+    """
+    Draw *num_samples* partitions and return them as tuples of cluster masks (cheap to pass between processes)
+    """
+    sampler = create_sampler(bitgraph, method, seed, burn_in, steps, table)
+    return [sampler.sample(k).blocks for _ in range(num_samples)]
+
+
+def sample_partitions(graph, num_samples, k=None, method='auto', jobs=1, seed=None, burn_in=None, steps=None):
+    """
+    Draw *num_samples* random connected partitions of *graph* into *k* clusters (any number of clusters if *k* is
+    None), see :func:`create_sampler`. If *jobs* is larger than 1, the samples are drawn by this number of worker
+    processes with the seeds *seed*, *seed* + 1, ...; each worker runs its own Markov chain. The counting table for
+    exact sampling is computed once and passed to the workers.
+
+    :return: A list of :class:`datastructures.SearchSpaceNode` objects
+    """
+    bitgraph = BitGraph.from_graph(graph)
+    if seed is None:
+        seed = random.randrange(2 ** 32)
+    table = counting_table(bitgraph, method)
+    if table is None:
+        method = 'mcmc'
+
+    if jobs < 2:
+        parts = [_sample_blocks(bitgraph, num_samples, k, method, seed, burn_in, steps, table)]
+    else:
+        shares = [num_samples // jobs + (idx < num_samples % jobs) for idx in range(jobs)]
+        pool = Pool(jobs)
+        parts = pool.starmap(_sample_blocks, [(bitgraph, share, k, method, seed + idx, burn_in, steps, table)
+                                              for idx, share in enumerate(shares)])
+        pool.close()
+        pool.join()
+
+    return [SearchSpaceNode(bitgraph, blocks) for part in parts for blocks in part]
+
+
+def main():
+    argparser = argparse.ArgumentParser(description='Draw random connected partitions of each graph in the input '
+                                                    'file.')
+    argparser.add_argument('path', type=str,
+                           help='Path to a csv file of graphs in Graph6 format (rows: name,graph6) or to a graph6 file')
+    argparser.add_argument('--names', type=str, nargs='*', default=None, help='Only sample these graphs')
+    argparser.add_argument('--samples', type=int, default=1000, help='Number of samples per graph')
+    argparser.add_argument('--k', type=int, default=None,
+                           help='Number of clusters of the samples (default: any number)')
+    argparser.add_argument('--method', type=str, choices=METHODS, default='auto',
+                           help='"exact" samples exactly uniformly (graphs of moderate size only), "mcmc" '
+                                'approximately by a Markov chain, "auto" exactly if the counting table needs at '
+                                'most {} clusters'.format(AUTO_MAX_SUBSETS))
+    argparser.add_argument('--burn_in', type=int, default=None,
+                           help='Number of steps of the Markov chain before the first sample (default: 100 m)')
+    argparser.add_argument('--steps', type=int, default=None,
+                           help='Number of steps of the Markov chain between two samples (default: 10 m)')
+    argparser.add_argument('--jobs', type=int, default=1, help='Number of worker processes')
+    argparser.add_argument('--seed', type=int, default=None, help='Seed of the random number generator')
+    argparser.add_argument('--out', type=str, default=None,
+                           help='Path to a csv file for the samples (columns: name, k, partition)')
+    args = argparser.parse_args()
+
+    if args.k is not None and args.k < 1:
+        argparser.error('--k must be positive')
+
+    out_file = open(args.out, 'w', newline='') if args.out else None
+    writer = csv.writer(out_file) if out_file is not None else None
+    if writer is not None:
+        writer.writerow(['name', 'k', 'partition'])
+
+    for graph in iter_graphs(args.path):
+        if args.names is not None and graph.name not in args.names:
+            continue
+        if args.k is not None and args.k > graph.number_of_nodes():  # The graphs are connected
+            print('Graph: {} (n={}): skipped, too few nodes for k={}'.format(graph.name, graph.number_of_nodes(),
+                                                                             args.k))
+            continue
+
+        start = time.perf_counter()
+        samples = sample_partitions(graph, args.samples, args.k, args.method, args.jobs, args.seed, args.burn_in,
+                                    args.steps)
+        seconds = time.perf_counter() - start
+
+        mean_k = sum(sample.num_clusters for sample in samples) / len(samples) if samples else float('nan')
+        print('Graph: {} (n={}, m={}): {} samples in {:.2f}s, mean k={:.3f}'.format(
+            graph.name, graph.number_of_nodes(), graph.number_of_edges(), len(samples), seconds, mean_k))
+
+        if writer is not None:
+            for sample in samples:
+                writer.writerow([graph.name, sample.num_clusters, str(sample)])
+
+    if out_file is not None:
+        out_file.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -7,62 +7,108 @@ by a path can be part of the same cluster.
 from __future__ import print_function, division, absolute_import, unicode_literals
 import argparse
 from collections import defaultdict
+from contextlib import redirect_stdout
 import csv
+from functools import partial
+import io
+from itertools import islice
+import json
 import math
+from multiprocessing import Pool
 import os.path
 
-from networkx import is_connected
-from networkx.readwrite.graph6 import from_graph6_bytes
 import pandas as pd
 
+from bitgraph import BitGraph
+from contraction import ContractionCounter
+from counting import subset_dp_profile
 from datastructures import SearchSpace
 from estimation import (DensityEstimator, MeanNeighborsEstimator, LbUbRatioEstimator, StirlingRatioEstimator,
                         StirlingDeltaEstimator, LbUbDeltaEstimator)
+from resultstore import ResultStore
+from treedecomposition import tree_decomposition_profile
 
+# Available ways to determine the number of partitions per level: None means full enumeration
+BACKENDS = {'enumeration': None,
+            'subset_dp': subset_dp_profile,
+            'contraction': ContractionCounter(),
+            'tree_dp': tree_decomposition_profile}
 
-def read_graphs(path):
-    graphs = []
+GRAPH6_HEADER = '>>graph6<<'
+
+# Number of graphs that are handed to the process pool at once
+TASK_BATCH_SIZE = 1000
+
+# Number of graphs after which the memo table of --memo is saved (and once at the end)
+MEMO_SAVE_INTERVAL = 100
+
+_counter = None  # The counter of the current process, see _init_counter
+
+
+def _graph6_lines(f):
+    """
+    The *(name, graph6)* rows of a plain graph6 file; the name is the graph6 string
+    """
+    for line in f:
+        line = line.strip()
+        if line.startswith(GRAPH6_HEADER):
+            line = line[len(GRAPH6_HEADER):]
+        if line:
+            yield line, line
+
+
+def iter_graphs(path, connected_only=True):
+    """
+    Lazily read the graphs of a csv file with the columns *name* and *graph6* or of a plain graph6 file (any other
+    file extension than ``.csv``; one graph per line, optionally with a ``>>graph6<<`` header). The graphs of plain
+    graph6 files are named by their graph6 string.
+    The graphs are decoded into :class:`bitgraph.BitGraph` instances.
+    If *connected_only* is True, disconnected graphs are skipped.
+    """
     with open(path) as f:
-        r = csv.reader(f)
-        header = next(r)  # Header
-        if len(header) != 2 or header[0] != 'name' or header[1] != 'graph6':
-            raise Exception('Invalid file format')
+        if path.endswith('.csv'):
+            rows = csv.reader(f)
+            header = next(rows)  # Header
+            if len(header) != 2 or header[0] != 'name' or header[1] != 'graph6':
+                raise Exception('Invalid file format')
+        else:
+            rows = _graph6_lines(f)
 
-        for row in r:
-            name, graph6_string = row
-            graph = from_graph6_bytes(bytes(graph6_string, 'ascii'))
-            graph.name = name
-            if is_connected(graph):
-                graphs.append(graph)
+        for name, graph6_string in rows:
+            graph = BitGraph.from_graph6(graph6_string, name=name)
+            if not connected_only or graph.is_connected():
+                yield graph
 
-    return graphs
 
+def read_graphs(path, connected_only=True):
+    """
+    Read all graphs of a file at once, see :func:`iter_graphs`
+    """
+    return list(iter_graphs(path, connected_only))
 
-def main():
-    argparser = argparse.ArgumentParser(description='Enumerate the full searchspace for each graph in the input file.')
-    argparser.add_argument('path', type=str, help='Path to a csv file of graphs in Graph6 format (rows: name,graph6)',
-                           default=None)
-    argparser.add_argument('--partitions', nargs='?', const=True, default=False,
-                           help='Print partitions per search space level. Can only be used together '
-                                'with --no_compression')
-    argparser.add_argument('--no_compression', nargs='?', const=True, default=False,
-                           help='Do not compress the search space level after expansion.')
-    argparser.add_argument('--out', type=str, help='Path to a output folder (must exist)', default=None)
-    args = argparser.parse_args()
 
-    graphs = read_graphs(args.path)
+ESTIMATORS = [MeanNeighborsEstimator(),
+              DensityEstimator(),
+              StirlingRatioEstimator(),
+              StirlingDeltaEstimator(),
+              LbUbRatioEstimator(),
+              LbUbDeltaEstimator()]
 
-    estimators = [MeanNeighborsEstimator(),
-                  DensityEstimator(),
-                  StirlingRatioEstimator(),
-                  StirlingDeltaEstimator(),
-                  LbUbRatioEstimator(),
-                  LbUbDeltaEstimator()]
 
-    records = []
-    errors = defaultdict(float)
+def process_graph(graph, counter=None, compress=True, decompose=False, print_partitions=False, level_jobs=1,
+                  memory_budget=None, tmp_dir=None, canonical=False, symmetric=False, profile=None):
+    """
+    Build the search space of *graph* and evaluate all estimators on it.
+    Everything is printed into a buffer instead of stdout, so this can run in a worker process.
+    If the k-profile of the graph is known already (e.g. from a :class:`resultstore.ResultStore`), the
+    search space is created from *profile* instead.
 
-    for graph in graphs:
+    :return: A tuple *(output, record, level records, errors, profile, level stats)*; *errors* is a list of
+        *(estimator name, AE)* pairs or None if the estimators were not evaluated (disconnected graph), the level
+        stats are those of :meth:`datastructures.SearchSpace.level_stats`
+    """
+    out = io.StringIO()
+    with redirect_stdout(out):
         degrees = graph.degree()
         print('Graph: {} (n={}, m={}, min_deg={}, max_deg={})'.format(graph.name,
                                                                       graph.number_of_nodes(),
@@ -70,20 +116,32 @@ def main():
                                                                       min(degrees, key=lambda x: x[1])[1],
                                                                       max(degrees, key=lambda x: x[1])[1]))
 
-        sp = SearchSpace(graph, compress=not args.no_compression)
-        sp.build()
+        if profile is not None:
+            sp = SearchSpace(graph, counter=lambda _: profile)
+            sp.build()
+        else:
+            sp = SearchSpace(graph, compress=compress, counter=counter, decompose=decompose, jobs=level_jobs,
+                             memory_budget=memory_budget, tmp_dir=tmp_dir, canonical=canonical, symmetric=symmetric)
+            sp.build()
+
+        sp.print_results(print_partitions)
+        if canonical and profile is None:
+            print('Generated candidates = {}'.format(sp.num_candidates()))
+            print()
 
-        sp.print_results(args.partitions)
-        records.append(sp.to_record())
+        if sp.num_components > 1:  # The estimators assume connected graphs
+            return out.getvalue(), sp.to_record(), sp.levels_to_records(), None, sp.profile(), sp.level_stats()
 
-        for estimator in estimators:
-            est = estimator.num_partitions(sp.num_nodes, sp.num_edges)
+        errors = []
+        for estimator in ESTIMATORS:
+            est_profile = estimator.num_partitions_profile(sp.num_nodes, sp.num_edges)
+            est = estimator.total(est_profile)
             ss = 0
             ae = 0
             print(estimator.name)
             print('Estimated number of partitions: {:.5f}'.format(est))
             for k in range(sp.num_nodes, 0, -1):
-                est_k = estimator.num_partitions(sp.num_nodes, sp.num_edges, k)
+                est_k = est_profile[k]
                 print('k={}\test #Partitions={}'.format(k, est_k))
                 ss += float(est_k - sp.num_partitions(sp.num_nodes - k)) ** 2
                 ae += abs((est_k - sp.num_partitions(sp.num_nodes - k)) / sp.num_partitions(sp.num_nodes - k))
@@ -93,16 +151,209 @@ def main():
             print('SS: {:.3f}'.format(ss))
             print('RMSE: {:.3f}'.format(rmse))
             print('AE: {:.3f}'.format(ae))
-            errors[estimator.name] += ae
+            errors.append((estimator.name, ae))
             print()
 
+    return out.getvalue(), sp.to_record(), sp.levels_to_records(), errors, sp.profile(), sp.level_stats()
+
+
+def _init_counter(backend, memo_path=None):
+    """
+    Create the counter of the current process (pool initializer): Each process has its own memo table of the
+    contraction backend, which is never passed between processes
+    """
+    global _counter
+    if backend == 'contraction':
+        _counter = ContractionCounter(memo_path=memo_path)
+    else:
+        _counter = BACKENDS[backend]
+
+
+def _process_task(task, **kwargs):
+    """
+    Call :func:`process_graph` for a task *(graph, known profile)* with the counter of the current process
+    """
+    graph, profile = task
+    return process_graph(graph, counter=_counter, profile=profile, **kwargs)
+
+
+def main():
+    argparser = argparse.ArgumentParser(description='Enumerate the full searchspace for each graph in the input file.')
+    argparser.add_argument('path', type=str, help='Path to a csv file of graphs in Graph6 format (rows: name,graph6)',
+                           default=None)
+    argparser.add_argument('--partitions', nargs='?', const=True, default=False,
+                           help='Print partitions per search space level. Can only be used together '
+                                'with --no_compression')
+    argparser.add_argument('--no_compression', nargs='?', const=True, default=False,
+                           help='Do not compress the search space level after expansion.')
+    argparser.add_argument('--backend', type=str, choices=sorted(BACKENDS), default='enumeration',
+                           help='How to determine the number of partitions per level. Only "enumeration" '
+                                'creates the actual partitions, the other backends count them.')
+    argparser.add_argument('--canonical', nargs='?', const=True, default=False,
+                           help='Generate each partition only once from its canonical parent instead of '
+                                'deduplicating the children of all partitions (enumeration backend only)')
+    argparser.add_argument('--symmetry', nargs='?', const=True, default=False,
+                           help='Keep only one partition per orbit under the automorphisms of the graph in each '
+                                'search space level (enumeration backend only). The numbers of partitions are '
+                                'exact. This trades time for memory: Each child needs a canonical form, so the '
+                                'enumeration is slower unless the graph is highly symmetric.')
+    argparser.add_argument('--memo', type=str, default=None,
+                           help='Path to a file that stores the memo table of the contraction backend across '
+                                'runs (created if it does not exist)')
+    argparser.add_argument('--decompose', nargs='?', const=True, default=False,
+                           help='Split each graph into its biconnected components and combine the results of '
+                                'the components. Cannot be used together with --no_compression')
+    argparser.add_argument('--include_disconnected', nargs='?', const=True, default=False,
+                           help='Do not skip disconnected graphs. The estimators are only evaluated for '
+                                'connected graphs.')
+    argparser.add_argument('--jobs', type=int, default=1,
+                           help='Number of worker processes that handle the graphs in parallel. The output is '
+                                'the same as for a serial run.')
+    argparser.add_argument('--level_jobs', type=int, default=1,
+                           help='Number of worker processes that expand a single search space level in parallel '
+                                '(enumeration backend only). Cannot be combined with --jobs')
+    argparser.add_argument('--memory_budget', type=int, default=None,
+                           help='Store the partitions of each search space level on disk and use about this '
+                                'many MiB of memory per level (enumeration backend only)')
+    argparser.add_argument('--tmp_dir', type=str, default=None,
+                           help='Directory for the temporary files of --memory_budget and --level_jobs '
+                                '(default: system default)')
+    argparser.add_argument('--results', type=str, default=None,
+                           help='Path to a SQLite database of known search space sizes (created if it does not '
+                                'exist). Graphs found there are not computed again, new results are added.')
+    argparser.add_argument('--stats', type=str, default=None,
+                           help='Path to a json file for the statistics of each enumerated search space level '
+                                '(wall time, generated and unique partitions, duplicate ratio, peak memory)')
+    argparser.add_argument('--out', type=str, help='Path to a output folder (must exist)', default=None)
+    args = argparser.parse_args()
+
+    if args.no_compression and (BACKENDS[args.backend] is not None or args.decompose):
+        argparser.error('--no_compression can only be used with the enumeration backend and without --decompose')
+
+    if args.level_jobs > 1 and (args.jobs > 1 or BACKENDS[args.backend] is not None or args.decompose):
+        argparser.error('--level_jobs can only be used with the enumeration backend, without --decompose and '
+                        'without --jobs')
+
+    if args.canonical and (BACKENDS[args.backend] is not None or args.decompose):
+        argparser.error('--canonical can only be used with the enumeration backend and without --decompose')
+
+    if args.symmetry and (BACKENDS[args.backend] is not None or args.decompose or args.canonical or
+                          args.level_jobs > 1 or args.memory_budget or args.partitions):
+        argparser.error('--symmetry can only be used with the enumeration backend and without --decompose, '
+                        '--canonical, --level_jobs, --memory_budget and --partitions')
+
+    if args.memory_budget and (args.level_jobs > 1 or BACKENDS[args.backend] is not None or args.decompose):
+        argparser.error('--memory_budget can only be used with the enumeration backend, without --decompose and '
+                        'without --level_jobs')
+
+    if args.results and args.no_compression:
+        argparser.error('--results cannot be used together with --no_compression')
+
+    if args.memo:
+        if args.backend != 'contraction':
+            argparser.error('--memo can only be used with the contraction backend')
+        if args.jobs > 1:
+            argparser.error('--memo cannot be shared by several jobs')
+
+    graphs = iter_graphs(args.path, connected_only=not args.include_disconnected)
+
+    store = ResultStore(args.results) if args.results else None
+
+    def task(graph):
+        """
+        The task *(graph, known profile)* of *graph* and its key in the store (None without a store)
+        """
+        if store is None:
+            return (graph, None), None
+        key = store.key(graph)
+        return (graph, store.profile(graph, key)), key
+
+    worker = partial(_process_task, compress=not args.no_compression, decompose=args.decompose,
+                     print_partitions=args.partitions, level_jobs=args.level_jobs,
+                     memory_budget=args.memory_budget * 2 ** 20 if args.memory_budget else None, tmp_dir=args.tmp_dir,
+                     canonical=args.canonical, symmetric=args.symmetry)
+
+    if args.jobs > 1:
+        pool = Pool(args.jobs, initializer=_init_counter, initargs=(args.backend,))
+    else:
+        pool = None
+        _init_counter(args.backend, args.memo)
+
+    def results():
+        """
+        Lazily process the graphs and yield *(graph, key in the store, result)* triples in input order
+        """
+        if pool is None:
+            for graph in graphs:  # Lazy, so isomorphic graphs later in the input are found in the store
+                graph_task, key = task(graph)
+                yield graph, key, worker(graph_task)
+            return
+
+        while True:
+            # The lookups of a batch happen up front, because the store must not be used by the task feeder thread
+            # of the pool
+            tasks = [task(graph) for graph in islice(graphs, TASK_BATCH_SIZE)]
+            if not tasks:
+                break
+
+            # Isomorphic unknown graphs of a batch are computed only once, the others reuse the profile
+            seen = set()
+            duplicates = []
+            for (_, profile), key in tasks:
+                duplicates.append(profile is None and key in seen)
+                if profile is None and key is not None:
+                    seen.add(key)
+            unique = [graph_task for (graph_task, _), duplicate in zip(tasks, duplicates) if not duplicate]
+            computed = pool.imap(worker, unique, max(1, len(unique) // (4 * args.jobs)))
+
+            profiles = {}
+            for ((graph, _), key), duplicate in zip(tasks, duplicates):
+                result = worker((graph, profiles[key])) if duplicate else next(computed)
+                profiles[key] = result[4]
+                yield graph, key, result
+
+    records = []
+    stats = []
+    errors = defaultdict(float)
+    num_estimated = 0
+
+    for num_graphs, (graph, key, (output, record, level_records, graph_errors, profile, level_stats)) in \
+            enumerate(results(), 1):
+        print(output, end='')
+        if args.memo and num_graphs % MEMO_SAVE_INTERVAL == 0:
+            _counter.save()
+        records.append(record)
+        stats.append({'name': record['name'], 'n': record['n'], 'm': record['m'], 'levels': level_stats})
+
+        if store is not None:
+            store.add(graph, profile, key)  # Kept if the graph was known already
+
+        if graph_errors is not None:
+            num_estimated += 1
+            for name, ae in graph_errors:
+                errors[name] += ae
+
         if args.out:
             out_path = os.path.join(args.out, '{}_searchspace.csv'.format(''.join(c if c.isalnum() else '_'
-                                                                                  for c in sp.graph_name)))
-            pd.DataFrame.from_records(sp.levels_to_records()).to_csv(out_path, index=False)
+                                                                                  for c in record['name'])))
+            pd.DataFrame.from_records(level_records).to_csv(out_path, index=False)
+
+    if pool is not None:
+        pool.close()
+        pool.join()
+
+    if store is not None:
+        store.close()
+
+    if args.memo:
+        _counter.save()
 
     for name, error_sum in errors.items():
-        print('Error of "{}": {:.3f}'.format(name, error_sum / len(graphs)))
+        print('Error of "{}": {:.3f}'.format(name, error_sum / num_estimated))
+
+    if args.stats:
+        with open(args.stats, 'w') as f:
+            json.dump(stats, f, indent=1)
 
     if args.out:
         out_path = os.path.join(args.out, 'graphs_searchspace.csv')
@@ -0,0 +1,129 @@
+"""
+A store for the partitions of a search space level that keeps only one representative per orbit under the
+automorphism group of the graph.
+
+Two partitions are in the same orbit iff an automorphism of the graph maps one onto the other, i.e. iff the
+graph together with the relation 'in the same cluster' yields the same certificate (see :mod:`canonical`).
+The group itself is never computed. Instead, the orbit sizes follow from double counting the merges between
+two orbits: Each partition of the orbit :math:`O_P` has the same number :math:`c` of children in the orbit
+:math:`O_C`, and each partition of :math:`O_C` has the same number :math:`p` of parents in :math:`O_P`, hence
+:math:`|O_C| = |O_P| \\cdot c / p`. The number of partitions of a level is the sum of its orbit sizes, so the
+exact counts are known although the level only stores about :math:`1/|Aut(G)|` of its partitions.
+"""
+from __future__ import print_function, division, absolute_import, unicode_literals
+
+from bitgraph import iter_bits, popcount
+from canonical import canonical_form
+from counting import connected_subsets
+
+
+def orbit_key(bitgraph, blocks):
+    """
+    The certificate of the orbit of the partition *blocks* (sorted tuple of cluster masks) of *bitgraph*
+    """
+    same_cluster = [0] * bitgraph.order()
+    for block in blocks:
+        for node in iter_bits(block):
+            same_cluster[node] = block & ~(1 << node)
+    return canonical_form(bitgraph.order(), [bitgraph.adjacency, same_cluster])
+
+
+def _cluster_sizes(blocks):
+    return sorted(popcount(block) for block in blocks)
+
+
+def parents(bitgraph, blocks):
+    """
+    Iterate over all parents of the partition *blocks*, i.e. the partitions that result from splitting a cluster
+    into two connected parts
+    """
+    for idx, cluster in enumerate(blocks):
+        if not cluster & (cluster - 1):  # Single node
+            continue
+
+        others = blocks[:idx] + blocks[idx + 1:]
+        for part in connected_subsets(bitgraph, cluster & -cluster, cluster):
+            if part != cluster and bitgraph.is_connected(cluster & ~part):
+                yield tuple(sorted(others + (part, cluster & ~part)))
+
+
+class OrbitStore(object):
+    """
+    A set-like container for :class:`datastructures.SearchSpaceNode` objects of a single level that keeps one
+    representative per orbit together with the orbit size. :func:`len` is the number of partitions of all orbits,
+    iteration yields the representatives only.
+    """
+
+    def __init__(self, bitgraph):
+        self._bitgraph = bitgraph
+        self._orbits = {}  # Orbit key -> (representative, orbit size)
+        self._size = 0
+
+    def add(self, node, orbit_size=1, key=None):
+        """
+        Add the orbit of *node* (if it is not known yet). The first level consists of the partition into single
+        nodes, which is its own orbit.
+        """
+        if key is None:
+            key = orbit_key(self._bitgraph, node.blocks)
+        if key not in self._orbits:
+            self._orbits[key] = (node, orbit_size)
+            self._size += orbit_size
+
+    @property
+    def num_orbits(self):
+        return len(self._orbits)
+
+    def orbits(self):
+        """
+        Iterate over all *(representative, orbit size)* pairs
+        """
+        return iter(self._orbits.values())
+
+    def expand_into(self, target):
+        """
+        Add the orbits of all children of the partitions of this store to the store *target*.
+
+        :return: The number of children that were generated from the representatives
+        """
+        bitgraph = self._bitgraph
+        candidates = 0
+
+        for key, (node, orbit_size) in self._orbits.items():
+            children = {}  # Orbit key -> [child, number of children in the orbit]
+            for child in node.expand():
+                candidates += 1
+                child_key = orbit_key(bitgraph, child.blocks)
+                if child_key in children:
+                    children[child_key][1] += 1
+                else:
+                    children[child_key] = [child, 1]
+
+            sizes = _cluster_sizes(node.blocks)
+            parent_keys = {node.blocks: key}  # The children of a representative share most of their parents
+            for child_key, (child, num_children) in children.items():
+                if child_key in target._orbits:
+                    continue
+
+                # Only parents with the same cluster sizes can be in the orbit of node. If there is a single one, it
+                # is the representative itself and no certificate is needed.
+                same_sizes = [parent for parent in parents(bitgraph, child.blocks) if _cluster_sizes(parent) == sizes]
+                num_parents = 1
+                if len(same_sizes) > 1:
+                    num_parents = 0
+                    for parent in same_sizes:
+                        if parent not in parent_keys:
+                            parent_keys[parent] = orbit_key(bitgraph, parent)
+                        num_parents += parent_keys[parent] == key
+                child_orbit_size, remainder = divmod(orbit_size * num_children, num_parents)
+                assert not remainder
+                target.add(child, child_orbit_size, child_key)
+
+        return candidates
+
+    def __len__(self):
+        return self._size
+
+    def __iter__(self):
+        for node, _ in self._orbits.values():
+            yield node
@@ -0,0 +1,25 @@
+"""
+Tests of the contraction backend. Run with ``python -m pytest -q`` in this folder.
+"""
+from __future__ import print_function, division, absolute_import, unicode_literals
+
+import networkx as nx
+
+from contraction import ContractionCounter
+from counting import subset_dp_profile
+
+
+def test_bounded_memo(tmp_path):
+    graph = nx.complete_graph(8)
+    graph.remove_edges_from([(0, 1), (2, 3), (4, 5)])
+    counter = ContractionCounter(max_entries=10)
+    assert counter(graph) == subset_dp_profile(graph)
+    assert len(counter.memo) == 10
+
+    # The least recently used entries are dropped when a saved memo table is loaded with a smaller bound
+    memo_path = str(tmp_path / 'memo.pkl')
+    counter = ContractionCounter(memo_path)
+    assert counter(graph) == subset_dp_profile(graph)
+    counter.save()
+    recent = list(counter.memo)[-5:]
+    assert list(ContractionCounter(memo_path, max_entries=5).memo) == recent
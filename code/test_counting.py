@@ -0,0 +1,104 @@
+"""
+Cross-check the ways to count the connected partitions of a graph against each other: the enumeration of the
+search space (also in its canonical, symmetric, parallel and on-disk variants and decomposed into blocks), the
+counting backends and the ranking of the partitions, on the bundled small graphs and a few random graphs. Run with
+``python -m pytest -q`` in this folder.
+"""
+from __future__ import print_function, division, absolute_import, unicode_literals
+import os.path
+import random
+
+import networkx as nx
+import pytest
+
+import datastructures
+from datastructures import PartitionRanking, SearchSpace, iter_partitions
+from searchspace import BACKENDS, read_graphs
+
+DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data')
+BUNDLED_INPUTS = ['input_smallgraphs_5nodes.csv', 'input_smallgraphs_fast.csv', 'input_smallgraphs.csv']
+# Larger bundled graphs take too long for all enumeration variants
+BUNDLED_MAX_NODES = 7
+
+
+def _bundled_graphs():
+    graphs = {}  # graph6 -> graph, the inputs overlap
+    for name in BUNDLED_INPUTS:
+        for graph in read_graphs(os.path.join(DATA, name)):
+            if graph.order() <= BUNDLED_MAX_NODES:
+                graphs.setdefault(graph.to_graph6(), graph.to_graph())
+    return list(graphs.values())
+
+
+def _random_graphs():
+    rng = random.Random(42)
+    graphs = []
+    for n, m in [(6, 7), (7, 12), (8, 10), (8, 16), (9, 12)]:
+        while True:
+            graph = nx.gnm_random_graph(n, m, seed=rng.randrange(2 ** 32))
+            if nx.is_connected(graph):
+                break
+        graph.name = 'G({},{})'.format(n, m)
+        graphs.append(graph)
+    return graphs
+
+
+GRAPHS = _bundled_graphs() + _random_graphs() + [nx.petersen_graph()]
+GRAPH_IDS = [graph.name or str(idx) for idx, graph in enumerate(GRAPHS)]
+
+
+def _profile(graph, **kwargs):
+    search_space = SearchSpace(graph, **kwargs)
+    search_space.build()
+    return search_space.profile()
+
+
+@pytest.fixture(scope='module', params=GRAPHS, ids=GRAPH_IDS)
+def graph_and_profile(request):
+    return request.param, _profile(request.param)
+
+
+@pytest.mark.parametrize('backend', sorted(name for name, counter in BACKENDS.items() if counter is not None))
+def test_backends(graph_and_profile, backend):
+    graph, profile = graph_and_profile
+    assert list(BACKENDS[backend](graph)) == profile
+
+
+@pytest.mark.parametrize('kwargs', [dict(decompose=True), dict(canonical=True), dict(symmetric=True),
+                                    dict(compress=False)], ids=['decompose', 'canonical', 'symmetric', 'uncompressed'])
+def test_enumeration_modes(graph_and_profile, kwargs):
+    graph, profile = graph_and_profile
+    assert _profile(graph, **kwargs) == profile
+
+
+def test_memory_budget(graph_and_profile, tmp_path):
+    graph, profile = graph_and_profile
+    assert _profile(graph, memory_budget=4096, tmp_dir=str(tmp_path)) == profile
+
+
+@pytest.mark.parametrize('compress', [True, False])
+def test_parallel_levels(graph_and_profile, monkeypatch, compress):
+    graph, profile = graph_and_profile
+    if graph.number_of_nodes() < 7:
+        pytest.skip('Starting the worker processes takes longer than the whole enumeration')
+    monkeypatch.setattr(datastructures, 'PARALLEL_MIN_PARTITIONS', 1)  # Expand all levels in parallel
+    assert _profile(graph, jobs=2, compress=compress) == profile
+
+
+def test_decompose_with_counter(graph_and_profile):
+    graph, profile = graph_and_profile
+    assert _profile(graph, decompose=True, counter=BACKENDS['subset_dp']) == profile
+
+
+def test_ranking(graph_and_profile):
+    graph, profile = graph_and_profile
+    ranking = PartitionRanking(graph)
+    for k in range(1, graph.number_of_nodes() + 1):
+        partitions = list(iter_partitions(graph, k))
+        assert ranking.num_partitions(k) == len(partitions) == profile[k]
+        for index, node in enumerate(partitions):
+            assert ranking.unrank(index, k).blocks == node.blocks
+            assert ranking.rank(node) == index
+
+    with pytest.raises(IndexError):
+        ranking.unrank(profile[1], 1)
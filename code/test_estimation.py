@@ -0,0 +1,41 @@
+"""
+Tests of the vectorized estimators. Run with ``python -m pytest -q`` in this folder.
+"""
+from __future__ import print_function, division, absolute_import, unicode_literals
+import math
+
+import numpy as np
+import pytest
+
+from combinatorics import bell
+from estimation import LbUbRatioEstimator
+
+
+def _log10_total(estimator, n, m):
+    return math.log10(estimator.total(estimator.num_partitions_profile(n, m)))
+
+
+@pytest.mark.parametrize('n', [4, 5, 10, 20, 40])
+def test_lb_ub_ratio_batch_complete_graphs(n):
+    # Regression: The batch recursion lost all precision for complete graphs and returned NaN (e.g. for K_40)
+    estimator = LbUbRatioEstimator()
+    m = n * (n - 1) // 2
+    assert estimator.num_partitions_batch(n, m) == pytest.approx(_log10_total(estimator, n, m), rel=1e-9)
+
+
+@pytest.mark.parametrize('n', [60, 101, 150, 300])
+def test_lb_ub_ratio_batch_large_complete_graphs(n):
+    # The estimate of a complete graph is the upper bound, i.e. the Bell number
+    estimate = LbUbRatioEstimator().num_partitions_batch(n, n * (n - 1) // 2)
+    assert estimate == pytest.approx(math.log10(bell(n)), rel=1e-9)
+
+
+def test_lb_ub_ratio_batch_matches_scalar():
+    # Per k: Dense graphs have negative estimates for small k, which make the batch total NaN
+    estimator = LbUbRatioEstimator()
+    for n in (8, 15, 30, 40):
+        for m in (n - 1, 2 * n, n * (n - 1) // 2 - 3):
+            profile = estimator.num_partitions_profile(n, m)
+            k = np.array([k for k in range(1, n + 1) if profile[k] > 0])
+            expected = [math.log10(profile[k_]) for k_ in k]
+            assert estimator.num_partitions_batch(n, m, k) == pytest.approx(expected, rel=1e-9)
@@ -0,0 +1,38 @@
+"""
+Tests of the disk-backed level store. Run with ``python -m pytest -q`` in this folder.
+"""
+from __future__ import print_function, division, absolute_import, unicode_literals
+
+import networkx as nx
+
+import levelstore
+from bitgraph import BitGraph
+from datastructures import SearchSpace, iter_partitions
+from levelstore import ExternalLevelStore
+
+
+def test_multi_pass_merge(monkeypatch, tmp_path):
+    monkeypatch.setattr(levelstore, 'MERGE_FAN_IN', 3)
+    bitgraph = BitGraph.from_graph(nx.petersen_graph())
+    partitions = [node for k in (3, 4) for node in iter_partitions(bitgraph, k)]
+
+    store = ExternalLevelStore(bitgraph, 1, str(tmp_path))  # One partition per run
+    for node in partitions + partitions[::7]:  # With duplicates in different runs
+        store.add(node)
+    assert len(store._runs) > 3 ** 2  # At least two intermediate passes
+
+    assert len(store) == len(partitions)
+    assert sorted(node.blocks for node in store) == sorted(node.blocks for node in partitions)
+    assert sorted(node.blocks for node in store) == sorted(node.blocks for node in partitions)  # Read again
+    assert len(list(tmp_path.iterdir())) == 1  # The directory of the runs
+    assert len(list(next(tmp_path.iterdir()).iterdir())) == 1  # Only the merged file is left
+
+
+def test_search_space_with_many_runs(monkeypatch, tmp_path):
+    monkeypatch.setattr(levelstore, 'MERGE_FAN_IN', 4)
+    graph = nx.grid_2d_graph(3, 3)
+    reference = SearchSpace(graph)
+    reference.build()
+    search_space = SearchSpace(graph, memory_budget=2000, tmp_dir=str(tmp_path))
+    search_space.build()
+    assert search_space.profile() == reference.profile()
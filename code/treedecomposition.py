@@ -0,0 +1,206 @@
+"""
+Count the connected partitions of a graph by dynamic programming over a tree decomposition.
+
+A tree decomposition (computed heuristically, see :func:`tree_decomposition`) is processed bottom-up. The partial
+solutions of a subtree are the partitions of its nodes; they are grouped by their *connectivity pattern* on the
+bag: the clusters of the bag nodes and, within each cluster, the parts that are already connected by the
+processed edges. All processed nodes that are not in the bag any more belong either to a cluster with a bag node
+or to a completed cluster, so the pattern and the number of completed clusters determine all extensions.
+
+The decomposition is turned into the usual steps of a nice tree decomposition on the fly:
+
+* *Introduce* a node: It becomes a new cluster or joins one of the clusters of the bag, as a new part.
+* *Forget* a node: The edges to the remaining bag nodes are processed first, i.e. the parts of adjacent nodes of
+  the same cluster are joined. Each edge is processed exactly once, when its first end node is forgotten. If the
+  node was the last bag node of its cluster, the cluster is completed. If it was the last bag node of its part,
+  but not of its cluster, the part can never be connected to the rest of the cluster and the solution is dropped.
+* *Join* two subtrees with the same bag: The clusters must be the same, the parts of both sides are united.
+
+The number of patterns only depends on the width of the decomposition, so for graphs of small treewidth (paths,
+ladders, grids with few rows, series-parallel graphs) graphs of thousands of nodes can be counted. The profiles
+(polynomials in :math:`k`, see :mod:`counting`) grow with the number of nodes, hence the run time is roughly
+quadratic in :math:`n` for a fixed width.
+"""
+from __future__ import print_function, division, absolute_import, unicode_literals
+
+from networkx import Graph
+from networkx.algorithms.approximation import treewidth_min_degree
+
+from bitgraph import BitGraph
+from counting import multiply_profiles
+
+
+def tree_decomposition(bitgraph):
+    """
+    A tree decomposition of *bitgraph* by the minimum degree heuristic. Disconnected graphs yield a single tree
+    as well.
+
+    :return: A tuple *(width, bags, children, root)*; *bags* is a list of sorted tuples of node indices,
+        *children* the list of child indices of each bag
+    """
+    graph = Graph()
+    graph.add_nodes_from(range(bitgraph.order()))
+    graph.add_edges_from(bitgraph.index_edges())
+    width, decomposition = treewidth_min_degree(graph)
+
+    nodes = list(decomposition.nodes)
+    index = {bag: idx for idx, bag in enumerate(nodes)}
+    bags = [tuple(sorted(bag)) for bag in nodes]
+    children = [[] for _ in bags]
+    # A leaf as root: Path-like decompositions then have no join step, whose profile products are expensive
+    root = min(range(len(nodes)), key=lambda idx: decomposition.degree(nodes[idx]))
+    visited = {root}
+    stack = [root]
+    while stack:  # Iterative, the decompositions of large graphs are deep
+        idx = stack.pop()
+        for neighbour in decomposition.neighbors(nodes[idx]):
+            child = index[neighbour]
+            if child not in visited:
+                visited.add(child)
+                children[idx].append(child)
+                stack.append(child)
+
+    return width, bags, children, root
+
+
+def _normalize(clusters, parts):
+    """
+    Relabel the cluster and part labels of the bag nodes by their first appearance
+    """
+    cluster_labels = {}
+    part_labels = {}
+    return (tuple(cluster_labels.setdefault(c, len(cluster_labels)) for c in clusters),
+            tuple(part_labels.setdefault(p, len(part_labels)) for p in parts))
+
+
+def _add_profile(table, state, profile):
+    if state in table:
+        current = table[state]
+        if len(current) < len(profile):
+            current.extend([0] * (len(profile) - len(current)))
+        for k, num in enumerate(profile):
+            current[k] += num
+    else:
+        table[state] = list(profile)
+
+
+def _introduce(table, bag, node):
+    """
+    Introduce *node* into the *table* of *bag*
+
+    :return: A tuple *(new table, new bag)*
+    """
+    pos = sum(1 for other in bag if other < node)
+    new_bag = bag[:pos] + (node,) + bag[pos:]
+    new_table = {}
+    for (clusters, parts), profile in table.items():
+        new_part = len(bag)  # Larger than all labels
+        for cluster in set(clusters) | {len(bag)}:
+            state = _normalize(clusters[:pos] + (cluster,) + clusters[pos:], parts[:pos] + (new_part,) + parts[pos:])
+            _add_profile(new_table, state, profile)
+    return new_table, new_bag
+
+
+def _forget(table, bag, node, adjacency):
+    """
+    Process the edges of *node* to the other nodes of *bag* and forget *node*
+
+    :return: A tuple *(new table, new bag)*
+    """
+    pos = bag.index(node)
+    neighbours = [idx for idx, other in enumerate(bag) if adjacency[node] >> other & 1]
+    new_bag = bag[:pos] + bag[pos + 1:]
+    new_table = {}
+    for (clusters, parts), profile in table.items():
+        cluster = clusters[pos]
+        joined = {parts[pos]}
+        joined.update(parts[idx] for idx in neighbours if clusters[idx] == cluster)
+        part = min(joined)
+        parts = tuple(part if p in joined else p for p in parts)
+
+        rest_clusters = clusters[:pos] + clusters[pos + 1:]
+        rest_parts = parts[:pos] + parts[pos + 1:]
+        if cluster not in rest_clusters:  # Completed
+            profile = [0] + profile
+        elif part not in rest_parts:  # Cut off from the rest of its cluster
+            continue
+
+        _add_profile(new_table, _normalize(rest_clusters, rest_parts), profile)
+    return new_table, new_bag
+
+
+def _join(first, second):
+    """
+    Join the tables of two subtrees with the same bag
+    """
+    by_clusters = {}
+    for (clusters, parts), profile in second.items():
+        by_clusters.setdefault(clusters, []).append((parts, profile))
+
+    table = {}
+    for (clusters, parts), profile in first.items():
+        for other_parts, other_profile in by_clusters.get(clusters, ()):
+            # Unite the parts of both sides: position i is labelled by its smallest reachable position
+            labels = list(range(len(parts)))
+            changed = True
+            while changed:
+                changed = False
+                for i in range(len(parts)):
+                    for j in range(i + 1, len(parts)):
+                        if (parts[i] == parts[j] or other_parts[i] == other_parts[j]) and labels[i] != labels[j]:
+                            labels[i] = labels[j] = min(labels[i], labels[j])
+                            changed = True
+            _add_profile(table, _normalize(clusters, labels), multiply_profiles(profile, other_profile))
+    return table
+
+
+def tree_decomposition_profile(graph):
+    """
+    Compute the k-profile of *graph* by dynamic programming over a tree decomposition (see the module
+    documentation).
+
+    :param graph: A NetworkX graph or a :class:`BitGraph`, it may be disconnected
+    :return: The k-profile
+    """
+    bitgraph = BitGraph.from_graph(graph)
+    n = bitgraph.order()
+    if not n:
+        return [1]
+
+    adjacency = bitgraph.adjacency
+    _, bags, children, root = tree_decomposition(bitgraph)
+
+    # Post-order without recursion
+    order = []
+    stack = [root]
+    while stack:
+        idx = stack.pop()
+        order.append(idx)
+        stack.extend(children[idx])
+
+    results = {}
+    for idx in reversed(order):
+        bag = bags[idx]
+        table = None
+        for child in children[idx]:
+            child_table, child_bag = results.pop(child)
+            for node in child_bag:
+                if node not in bag:
+                    child_table, child_bag = _forget(child_table, child_bag, node, adjacency)
+            for node in bag:
+                if node not in child_bag:
+                    child_table, child_bag = _introduce(child_table, child_bag, node)
+            table = child_table if table is None else _join(table, child_table)
+
+        if table is None:  # Leaf
+            table, current = {((), ()): [1]}, ()
+            for node in bag:
+                table, current = _introduce(table, current, node)
+        results[idx] = table, bag
+
+    table, bag = results.pop(root)
+    for node in bag:
+        table, bag = _forget(table, bag, node, adjacency)
+
+    profile = table.get(((), ()), [])
+    return profile + [0] * (n + 1 - len(profile))